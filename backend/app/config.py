@@ -11,13 +11,116 @@ class Settings(BaseSettings):
     moodle_url: str = "http://localhost:8090"
     moodle_token: str = ""
 
+    # Cliente HTTP hacia Moodle (compartido por todo el proceso)
+    moodle_timeout: float = 30.0
+    moodle_connect_timeout: float = 5.0
+    moodle_max_connections: int = 100
+    moodle_max_keepalive_connections: int = 20
+    moodle_keepalive_expiry: float = 30.0
+    moodle_http2: bool = False
+    # Comparte una sola llamada entre lecturas idénticas concurrentes
+    moodle_coalesce_reads: bool = True
+    # Agrupa lecturas en tool_mobile_call_external_functions (el servicio debe incluirla)
+    moodle_batching: bool = False
+    moodle_batch_window_ms: float = 3.0
+    moodle_batch_max_size: int = 10
+    # Límite adaptativo (AIMD) de peticiones simultáneas a Moodle y cola de espera
+    moodle_limit_enabled: bool = True
+    moodle_limit_initial: int = 20
+    moodle_limit_min: int = 2
+    moodle_limit_max: int = 200
+    moodle_limit_tolerance: float = 2.0
+    moodle_queue_max: int = 100
+    moodle_queue_timeout: float = 5.0
+    # Circuit breaker por wsfunction: fallos seguidos para abrir y segundos hasta probar
+    moodle_breaker_enabled: bool = True
+    moodle_breaker_failures: int = 5
+    moodle_breaker_reset_timeout: float = 30.0
+    # Lecturas: espera máxima a Moodle antes de servir la última respuesta vencida
+    moodle_stale_timeout: float = 2.0
+    # Lecturas: segunda petición si la primera supera el p95 observado (carga extra
+    # acotada a moodle_hedge_max_ratio) y reintentos con jitter ante errores de conexión
+    moodle_hedging: bool = False
+    moodle_hedge_percentile: float = 95.0
+    moodle_hedge_min_delay_ms: float = 20.0
+    moodle_hedge_max_ratio: float = 0.1
+    moodle_retries: int = 2
+    moodle_retry_backoff_ms: float = 50.0
+    moodle_read_deadline: float = 10.0
+
+    # Cache de respuestas de lectura de Moodle
+    cache_enabled: bool = True
+    cache_max_bytes: int = 32 * 1024 * 1024
+    # TTL (segundos) por wsfunction; se combina con los valores por defecto
+    cache_ttls: dict[str, float] = {}
+    # Segundos máximos que se guarda una respuesta ya serializada (con su ETag)
+    response_cache_ttl: float = 60.0
+    # Segundos que una lectura vencida se conserva para servirla si Moodle falla
+    cache_stale_ttl: float = 3600.0
+
+    # Compresión de respuestas (br y zstd solo si están instaladas)
+    compression_min_size: int = 1024
+    compression_encodings: list[str] = ["br", "zstd", "gzip"]
+
     # Google OAuth
     google_client_id: str = ""
+    # Claves públicas (JWKS) para verificar ID tokens; se cachean según su Cache-Control
+    google_certs_url: str = "https://www.googleapis.com/oauth2/v3/certs"
+    google_certs_default_ttl: float = 300.0
 
     # JWT
     jwt_secret: str = "dev-secret-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_expiration_minutes: int = 60
+    # Access tokens ya verificados que se recuerdan hasta su expiración
+    auth_cache_max_entries: int = 10000
+
+    # Índice de matrículas por usuario (segundos de validez y usuarios máximos)
+    enrolment_ttl: float = 60.0
+    enrolment_max_users: int = 10000
+
+    # Índice discusión -> primer post (entradas máximas)
+    first_post_max_entries: int = 50000
+
+    # Índice email -> usuario de Moodle para el login (encontrados / inexistentes)
+    user_ttl: float = 300.0
+    user_negative_ttl: float = 30.0
+    user_max_entries: int = 10000
+
+    # Dashboard: llamadas simultáneas a Moodle por petición
+    dashboard_concurrency: int = 8
+
+    # Sincronización incremental (/sync): llamadas simultáneas a Moodle, discusiones
+    # por foro (las más recientes), segundos que se recuerdan los borrados y
+    # usuarios con vista guardada
+    sync_concurrency: int = 8
+    sync_discussions_per_forum: int = 20
+    sync_tombstone_ttl: float = 7 * 86400
+    sync_max_users: int = 10000
+
+    # Precarga tras el login (cursos, tareas y contenidos de los primeros cursos):
+    # precargas simultáneas en todo el proceso, pendientes máximas, cursos por
+    # usuario, segundos máximos por precarga y segundos sin repetir por usuario
+    prefetch_enabled: bool = True
+    prefetch_concurrency: int = 4
+    prefetch_max_pending: int = 100
+    prefetch_max_courses: int = 5
+    prefetch_budget: float = 10.0
+    prefetch_cooldown: float = 300.0
+
+    # Métricas en /metrics (formato Prometheus)
+    metrics_enabled: bool = True
+
+    # Header Server-Timing en cada respuesta (auth, upstream, transform, serialize)
+    server_timing_enabled: bool = True
+    # Profiler por muestreo: fracción de peticiones perfiladas, token que fuerza el
+    # perfil con el header X-Profile (vacío = deshabilitado), umbral para guardar
+    # los perfiles de muestreo y carpeta donde se guardan
+    profile_sample_rate: float = 0.0
+    profile_token: str = ""
+    profile_slow_ms: float = 500.0
+    profile_interval_ms: float = 5.0
+    profile_dir: str = "profiles"
 
     # App
     debug: bool = True
@@ -1,18 +1,184 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .config import get_settings
-from .routers import auth_router, courses_router, assignments_router, forums_router
+from .middleware import (
+    CompressionMiddleware,
+    ConditionalGetMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    ServerTimingMiddleware,
+    StaleResponseMiddleware,
+)
+from .middleware.etag import RENDER_FUNCTION, stats as conditional_get_stats
+from .routers import (
+    auth_router,
+    courses_router,
+    assignments_router,
+    forums_router,
+    dashboard_router,
+    sync_router,
+    metrics_router,
+    register_app_metrics,
+)
+from .services.cache import DEFAULT_TTLS, ResponseCache
+from .services.breaker import CircuitBreakers
+from .services.exceptions import MoodleUnavailable
+from .services.hedging import RequestHedger
+from .services.http_client import create_http_client
+from .services.limiter import AdaptiveLimiter
+from .services.moodle_client import MoodleClient
+from .services.oauth_service import GoogleTokenVerifier
+from .services.prefetch import PrefetchScheduler
+from .services.sync import SnapshotStore
+from .utils.security import configure_jwt, on_token_flush, token_cache_stats
 
 settings = get_settings()
 
+
+def _drop_rendered_responses() -> None:
+    """Al rotar el secreto JWT, las respuestas guardadas por token dejan de valer."""
+    moodle = getattr(app.state, "moodle", None)
+    if moodle is not None and moodle.cache is not None:
+        moodle.cache.invalidate_function(RENDER_FUNCTION)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea los clientes compartidos (Moodle, Google) al iniciar y los cierra al apagar."""
+    configure_jwt(
+        settings.jwt_secret,
+        settings.jwt_algorithm,
+        settings.jwt_expiration_minutes,
+        settings.auth_cache_max_entries,
+    )
+    http_client = create_http_client(settings)
+    cache = None
+    if settings.cache_enabled:
+        cache = ResponseCache(
+            settings.cache_max_bytes,
+            ttls={**DEFAULT_TTLS, **settings.cache_ttls},
+            stale_ttl=settings.cache_stale_ttl,
+        )
+    limiter = None
+    if settings.moodle_limit_enabled:
+        limiter = AdaptiveLimiter(
+            initial_limit=settings.moodle_limit_initial,
+            min_limit=settings.moodle_limit_min,
+            max_limit=settings.moodle_limit_max,
+            max_queue=settings.moodle_queue_max,
+            queue_timeout=settings.moodle_queue_timeout,
+            tolerance=settings.moodle_limit_tolerance,
+        )
+    breakers = None
+    if settings.moodle_breaker_enabled:
+        breakers = CircuitBreakers(
+            settings.moodle_breaker_failures, settings.moodle_breaker_reset_timeout
+        )
+    hedger = None
+    if settings.moodle_hedging or settings.moodle_retries > 0:
+        hedger = RequestHedger(
+            hedging=settings.moodle_hedging,
+            percentile=settings.moodle_hedge_percentile,
+            min_delay_ms=settings.moodle_hedge_min_delay_ms,
+            max_extra_ratio=settings.moodle_hedge_max_ratio,
+            max_retries=settings.moodle_retries,
+            retry_backoff_ms=settings.moodle_retry_backoff_ms,
+            deadline=settings.moodle_read_deadline,
+        )
+    app.state.moodle = MoodleClient(
+        settings.moodle_url,
+        settings.moodle_token,
+        http_client=http_client,
+        cache=cache,
+        coalesce=settings.moodle_coalesce_reads,
+        batching=settings.moodle_batching,
+        batch_window_ms=settings.moodle_batch_window_ms,
+        batch_max_size=settings.moodle_batch_max_size,
+        enrolment_ttl=settings.enrolment_ttl,
+        enrolment_max_users=settings.enrolment_max_users,
+        first_post_max_entries=settings.first_post_max_entries,
+        user_ttl=settings.user_ttl,
+        user_negative_ttl=settings.user_negative_ttl,
+        user_max_entries=settings.user_max_entries,
+        limiter=limiter,
+        breakers=breakers,
+        stale_timeout=settings.moodle_stale_timeout,
+        hedger=hedger,
+    )
+    app.state.snapshots = SnapshotStore(
+        tombstone_ttl=settings.sync_tombstone_ttl,
+        max_users=settings.sync_max_users,
+    )
+    app.state.prefetch = None
+    if settings.prefetch_enabled:
+        app.state.prefetch = PrefetchScheduler(
+            max_concurrency=settings.prefetch_concurrency,
+            max_pending=settings.prefetch_max_pending,
+            max_courses=settings.prefetch_max_courses,
+            budget=settings.prefetch_budget,
+            cooldown=settings.prefetch_cooldown,
+        )
+    app.state.google = GoogleTokenVerifier(
+        http_client,
+        settings.google_certs_url,
+        default_ttl=settings.google_certs_default_ttl,
+    )
+    try:
+        yield
+    finally:
+        if app.state.prefetch is not None:
+            await app.state.prefetch.close()
+        await http_client.aclose()
+
+
 app = FastAPI(
     title="Moodle Mobile API",
     description="API intermediaria para la aplicación móvil de Moodle",
     version="1.0.0",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# Marca las respuestas con datos vencidos (la más interna, para que el header viaje con ellas)
+app.add_middleware(StaleResponseMiddleware)
+
+# ETag / 304 y compresión (se registran antes que CORS para que CORS quede por fuera).
+# ConditionalGet comprime y cachea las variantes de los GET; Compression cubre el resto.
+app.add_middleware(
+    ConditionalGetMiddleware,
+    ttl=settings.response_cache_ttl,
+    minimum_size=settings.compression_min_size,
+    encodings=settings.compression_encodings,
+)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_min_size,
+    encodings=settings.compression_encodings,
 )
 
+# Server-Timing (por fuera del cache de respuestas, para no guardar tiempos viejos)
+if settings.server_timing_enabled:
+    app.add_middleware(ServerTimingMiddleware)
+
+# Profiler a pedido (header X-Profile con el token) o por muestreo
+if settings.profile_token or settings.profile_sample_rate > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.profile_dir,
+        sample_rate=settings.profile_sample_rate,
+        token=settings.profile_token,
+        slow_ms=settings.profile_slow_ms,
+        interval_ms=settings.profile_interval_ms,
+    )
+
+# Métricas por ruta (por fuera de cache y compresión, para medir lo que ve el cliente)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,11 +188,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+on_token_flush(_drop_rendered_responses)
+
+
+@app.exception_handler(MoodleUnavailable)
+async def moodle_unavailable_handler(request: Request, exc: MoodleUnavailable):
+    """Con Moodle saturado o caído (circuito abierto) se responde 503 de inmediato."""
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": "Moodle no esta disponible. Intenta de nuevo en unos segundos."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Registrar routers
 app.include_router(auth_router)
 app.include_router(courses_router)
 app.include_router(assignments_router)
 app.include_router(forums_router)
+app.include_router(dashboard_router)
+app.include_router(sync_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
+    register_app_metrics(app)
 
 
 @app.get("/", tags=["Health"])
@@ -38,8 +222,19 @@ async def root():
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Verificación de salud del servicio."""
+    moodle = app.state.moodle
+    cache = moodle.cache
     return {
         "status": "healthy",
         "moodle_url": settings.moodle_url,
         "debug": settings.debug,
+        "cache": cache.stats() if cache is not None else None,
+        "conditional_get": dict(conditional_get_stats),
+        "auth_cache": token_cache_stats(),
+        "moodle_limiter": moodle.limiter.stats() if moodle.limiter is not None else None,
+        "moodle_breakers": moodle.breakers.stats() if moodle.breakers is not None else None,
+        "stale_served": moodle.stale_served,
+        "moodle_hedging": moodle.hedger.stats() if moodle.hedger is not None else None,
+        "prefetch": app.state.prefetch.stats() if app.state.prefetch is not None else None,
+        "sync": app.state.snapshots.stats(),
     }
@@ -0,0 +1,15 @@
+from .etag import ConditionalGetMiddleware
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .stale import StaleResponseMiddleware
+from .timing import ServerTimingMiddleware
+
+__all__ = [
+    "ConditionalGetMiddleware",
+    "CompressionMiddleware",
+    "MetricsMiddleware",
+    "ProfilingMiddleware",
+    "ServerTimingMiddleware",
+    "StaleResponseMiddleware",
+]
@@ -0,0 +1,113 @@
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..utils.timing import timed
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+# Niveles por codificación: respuestas comprimidas en cada petición y
+# respuestas cacheadas (se comprimen una sola vez, se puede gastar más CPU)
+DYNAMIC_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+CACHED_LEVELS = {"br": 9, "zstd": 10, "gzip": 9}
+
+
+def available_encodings(preferred: list[str]) -> list[str]:
+    """Filtra las codificaciones preferidas a las que tienen librería instalada."""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in preferred if installed.get(encoding)]
+
+
+def negotiate(accept_encoding: str | None, encodings: list[str]) -> str | None:
+    """Elige la primera codificación soportada que el cliente acepte (q > 0)."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Comprime el cuerpo con la codificación indicada."""
+    level = (CACHED_LEVELS if cached else DYNAMIC_LEVELS)[encoding]
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Comprime respuestas completas (con Content-Length) según Accept-Encoding.
+
+    Las respuestas que ya traen Content-Encoding (p. ej. las servidas desde el
+    cache ya comprimidas) y las de streaming pasan sin cambios.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, encodings: list[str] | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings or ["br", "zstd", "gzip"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        body_parts: list[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                length = headers.get("content-length")
+                if (
+                    "content-encoding" in headers
+                    or length is None
+                    or int(length) < self.minimum_size
+                ):
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            with timed("compress"):
+                body = compress(b"".join(body_parts), encoding)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,206 @@
+import hashlib
+import time
+from collections import Counter
+from jose import jwt, JWTError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..services.cache import MISSING
+from ..services.moodle_client import upstream_calls
+from ..utils.timing import timed
+from .compression import available_encodings, compress, negotiate
+
+CACHE_CONTROL = (b"cache-control", b"private, no-cache")
+# "Función" bajo la que se guardan las respuestas serializadas en el ResponseCache
+RENDER_FUNCTION = "__render__"
+
+# Respuestas servidas ya serializadas y respuestas 304
+stats: Counter = Counter()
+
+
+def mark_uncacheable() -> None:
+    """La respuesta actual depende de algo más que lecturas de Moodle: no se guarda."""
+    calls = upstream_calls.get()
+    if calls is not None:
+        calls.append(None)
+
+
+def make_etag(body: bytes) -> str:
+    """Hash rápido del cuerpo, base del ETag fuerte."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def format_etag(etag: str, encoding: str | None) -> bytes:
+    """Cada codificación es una representación distinta y lleva su propio ETag."""
+    return f'"{etag}-{encoding}"'.encode() if encoding else f'"{etag}"'.encode()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Compara If-None-Match (lista, `*`, ETags débiles o con codificación) con el hash."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/").strip('"').split("-")[0] == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class RenderedResponse:
+    """Respuesta ya serializada con su ETag y sus variantes comprimidas."""
+
+    __slots__ = ("headers", "body", "etag", "variants")
+
+    def __init__(self, headers: list, body: bytes, etag: str):
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.variants: dict[str, bytes] = {}
+
+
+def _token_ttl(authorization: str | None) -> float | None:
+    """Segundos de vida que le quedan al token del header, si tiene `exp`."""
+    if not authorization:
+        return None
+    try:
+        claims = jwt.get_unverified_claims(authorization.removeprefix("Bearer ").strip())
+    except JWTError:
+        return 0.0
+    exp = claims.get("exp")
+    return exp - time.time() if exp else None
+
+
+class ConditionalGetMiddleware:
+    """
+    ETag + If-None-Match para todos los GET.
+
+    Las respuestas 200 con cuerpo completo llevan un ETag fuerte y se responde
+    304 si el cliente ya tiene esa versión. Si la respuesta se construyó solo con
+    llamadas cacheables a Moodle, el cuerpo serializado y su ETag se guardan en
+    el cache de respuestas, dependiendo de esas llamadas: las revalidaciones y
+    repeticiones no vuelven a ejecutar el endpoint ni a serializar. Las
+    respuestas en streaming (sin Content-Length) pasan sin cambios.
+
+    También negocia la compresión de estas respuestas: las variantes
+    comprimidas se guardan junto a la respuesta cacheada, así cada payload se
+    comprime una sola vez por codificación.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        ttl: float = 60.0,
+        minimum_size: int = 1024,
+        encodings: list[str] | None = None,
+    ):
+        self.app = app
+        self.ttl = ttl
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings or ["br", "zstd", "gzip"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if_none_match = headers.get("if-none-match")
+        authorization = headers.get("authorization")
+        encoding = negotiate(headers.get("accept-encoding"), self.encodings)
+        moodle = getattr(scope["app"].state, "moodle", None)
+        cache = moodle.cache if moodle is not None else None
+
+        key = None
+        if cache is not None:
+            user = hashlib.blake2b((authorization or "").encode(), digest_size=16).hexdigest()
+            query = scope["query_string"].decode()
+            key = (RENDER_FUNCTION, f"{scope['path']}?{query}|{user}")
+            rendered = cache.peek(key)
+            if rendered is not MISSING:
+                stats["rendered_hits"] += 1
+                await self._send(send, rendered, if_none_match, encoding, cache, key)
+                return
+
+        calls: list = []
+        start: Message | None = None
+        body_parts: list[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                if message["status"] == 200 and "content-length" in response_headers:
+                    start = message
+                    return
+                await send(message)
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(body_parts)
+            response = RenderedResponse(
+                [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"etag")],
+                body,
+                make_etag(body),
+            )
+            stored = False
+            if key is not None and calls and None not in calls:
+                ttl = self.ttl
+                token_ttl = _token_ttl(authorization)
+                if token_ttl is not None:
+                    ttl = min(ttl, token_ttl)
+                if ttl > 0:
+                    cache.set(key, response, len(body), ttl, depends_on=list(dict.fromkeys(calls)))
+                    stored = True
+            await self._send(
+                send, response, if_none_match, encoding, cache if stored else None, key
+            )
+
+        token = upstream_calls.set(calls)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            upstream_calls.reset(token)
+
+    async def _send(
+        self,
+        send: Send,
+        response: RenderedResponse,
+        if_none_match: str | None,
+        encoding: str | None,
+        cache=None,
+        key: tuple[str, str] | None = None,
+    ) -> None:
+        """Envía la respuesta (o 304); con `cache` guarda la variante comprimida."""
+        if len(response.body) < self.minimum_size:
+            encoding = None
+        etag = format_etag(response.etag, encoding)
+        vary = [(b"vary", b"Accept-Encoding")] if len(response.body) >= self.minimum_size else []
+
+        if if_none_match and etag_matches(if_none_match, response.etag):
+            stats["not_modified"] += 1
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag), CACHE_CONTROL, *vary],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = response.body
+        headers = [*response.headers, (b"etag", etag), CACHE_CONTROL, *vary]
+        if encoding is not None:
+            body = response.variants.get(encoding)
+            if body is None:
+                with timed("compress"):
+                    body = compress(response.body, encoding, cached=cache is not None)
+                if cache is not None:
+                    response.variants[encoding] = body
+                    cache.grow(key, len(body))
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
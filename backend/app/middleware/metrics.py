@@ -0,0 +1,52 @@
+import time
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..services.metrics import REGISTRY, http_request_duration
+
+
+def _route_path(scope: Scope) -> str:
+    """Plantilla de la ruta; si no pasó por el router (p. ej. servida desde cache) se busca."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    for route in scope["app"].router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Mide cada petición HTTP: histograma de duración por método, ruta (la
+    plantilla, p. ej. `/courses/{course_id}`) y status, y peticiones en curso.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.in_flight = 0
+        REGISTRY.callback(
+            "http_requests_in_flight", "Peticiones HTTP en curso", lambda: self.in_flight
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight -= 1
+            http_request_duration.observe(
+                (scope["method"], _route_path(scope), status), time.perf_counter() - start
+            )
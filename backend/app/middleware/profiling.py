@@ -0,0 +1,69 @@
+import asyncio
+import hmac
+import random
+import re
+import secrets
+import time
+from pathlib import Path
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from ..utils.profiler import SamplingProfiler
+
+PROFILE_HEADER = "x-profile"
+
+
+class ProfilingMiddleware:
+    """
+    Perfila peticiones a pedido: siempre que traigan `X-Profile` con el token
+    de administración, o una fracción `sample_rate` de todas. Los perfiles se
+    guardan en `directory` (formato plegado, p. ej. para speedscope); los de
+    muestreo solo si la petición tardó al menos `slow_ms`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str,
+        sample_rate: float = 0.0,
+        token: str = "",
+        slow_ms: float = 500.0,
+        interval_ms: float = 5.0,
+    ):
+        self.app = app
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.token = token
+        self.slow_ms = slow_ms
+        self.profiler = SamplingProfiler(interval_ms)
+        self.dumped = 0
+
+    def _forced(self, scope: Scope) -> bool:
+        if not self.token:
+            return False
+        value = Headers(scope=scope).get(PROFILE_HEADER)
+        return value is not None and hmac.compare_digest(value.encode(), self.token.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        forced = self._forced(scope)
+        if not forced and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.stop(profile)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if (forced or elapsed_ms >= self.slow_ms) and profile.samples:
+                slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+                name = (
+                    f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{slug}"
+                    f"-{elapsed_ms:.0f}ms-{secrets.token_hex(3)}.folded"
+                )
+                await asyncio.to_thread(profile.dump, self.directory / name)
+                self.dumped += 1
@@ -0,0 +1,32 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..services.moodle_client import stale_reads
+
+STALE_HEADER = b"x-moodle-stale"
+
+
+class StaleResponseMiddleware:
+    """
+    Marca con `X-Moodle-Stale: true` las respuestas construidas con datos
+    vencidos del cache (Moodle caído, con el circuito abierto, o lento).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reads: list = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and reads:
+                message["headers"] = [*message["headers"], (STALE_HEADER, b"true")]
+            await send(message)
+
+        token = stale_reads.set(reads)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stale_reads.reset(token)
@@ -0,0 +1,36 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..utils.timing import RequestTiming, request_timing
+
+SERVER_TIMING_HEADER = b"server-timing"
+
+
+class ServerTimingMiddleware:
+    """
+    Agrega `Server-Timing` a cada respuesta: auth, upstream (total y por
+    wsfunction), transform, serialize, compress y total, en milisegundos.
+    Va por fuera del cache de respuestas para no guardar tiempos viejos.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message["headers"],
+                    (SERVER_TIMING_HEADER, timing.header()),
+                ]
+            await send(message)
+
+        token = request_timing.set(timing)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_timing.reset(token)
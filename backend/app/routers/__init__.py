@@ -2,5 +2,17 @@ from .auth import router as auth_router
 from .courses import router as courses_router
 from .assignments import router as assignments_router
 from .forums import router as forums_router
+from .dashboard import router as dashboard_router
+from .sync import router as sync_router
+from .metrics import router as metrics_router, register_app_metrics
 
-__all__ = ["auth_router", "courses_router", "assignments_router", "forums_router"]
+__all__ = [
+    "auth_router",
+    "courses_router",
+    "assignments_router",
+    "forums_router",
+    "dashboard_router",
+    "sync_router",
+    "metrics_router",
+    "register_app_metrics",
+]
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from pydantic import BaseModel
-from ..services.moodle_client import MoodleClient
+from ..services.moodle_client import MoodleClient, get_moodle_client
 from ..utils.security import get_current_user
-from ..config import get_settings
+from ..utils.responses import json_response
+from .courses import require_enrolled_course
 
 router = APIRouter(prefix="/assignments", tags=["Tareas"])
 
@@ -18,6 +19,11 @@ class AssignmentResponse(BaseModel):
     grade: int | None = None
 
 
+class CourseAssignmentsResponse(BaseModel):
+    course_id: int
+    assignments: List[AssignmentResponse] = []
+
+
 class SubmissionStatusResponse(BaseModel):
     status: str
     graded: bool
@@ -34,19 +40,55 @@ class SubmitAssignmentResponse(BaseModel):
     message: str
 
 
-@router.get("/course/{course_id}", response_model=List[AssignmentResponse])
+@router.get("", response_model=List[CourseAssignmentsResponse])
+async def get_all_assignments(
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
+):
+    """
+    Lista las tareas de todos los cursos del usuario, agrupadas por curso.
+    Usa una sola llamada a Moodle para todos los cursos.
+    """
+    user_id = int(current_user["sub"])
+    course_map = await moodle.get_user_course_map(user_id)
+    by_course = await moodle.get_assignments_by_courses(list(course_map))
+
+    return json_response([
+        CourseAssignmentsResponse(
+            course_id=course_id,
+            assignments=[
+                AssignmentResponse(
+                    id=assignment["id"],
+                    course_id=assignment.get("course", course_id),
+                    name=assignment.get("name", ""),
+                    intro=assignment.get("intro"),
+                    duedate=assignment.get("duedate"),
+                    allowsubmissionsfromdate=assignment.get("allowsubmissionsfromdate"),
+                    grade=assignment.get("grade"),
+                )
+                for assignment in assignments
+            ],
+        )
+        for course_id, assignments in by_course.items()
+    ])
+
+
+@router.get(
+    "/course/{course_id}",
+    response_model=List[AssignmentResponse],
+    dependencies=[Depends(require_enrolled_course)],
+)
 async def get_course_assignments(
-    course_id: int, current_user: dict = Depends(get_current_user)
+    course_id: int,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Lista todas las tareas de un curso.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     assignments = await moodle.get_assignments(course_id)
 
-    return [
+    return json_response([
         AssignmentResponse(
             id=assignment["id"],
             course_id=assignment.get("course", course_id),
@@ -57,24 +99,24 @@ async def get_course_assignments(
             grade=assignment.get("grade"),
         )
         for assignment in assignments
-    ]
+    ])
 
 
 @router.get("/{assignment_id}", response_model=AssignmentResponse)
 async def get_assignment_detail(
-    assignment_id: int, current_user: dict = Depends(get_current_user)
+    assignment_id: int,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Obtiene el detalle de una tarea específica.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
-    assignment = await moodle.get_assignment_by_id(assignment_id)
+    user_id = int(current_user["sub"])
+    assignment = await moodle.get_assignment_by_id(assignment_id, user_id)
     if not assignment:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
 
-    return AssignmentResponse(
+    return json_response(AssignmentResponse(
         id=assignment["id"],
         course_id=assignment.get("course", 0),
         name=assignment.get("name", ""),
@@ -82,28 +124,27 @@ async def get_assignment_detail(
         duedate=assignment.get("duedate"),
         allowsubmissionsfromdate=assignment.get("allowsubmissionsfromdate"),
         grade=assignment.get("grade"),
-    )
+    ))
 
 
 @router.get("/{assignment_id}/submission", response_model=SubmissionStatusResponse)
 async def get_submission_status(
-    assignment_id: int, current_user: dict = Depends(get_current_user)
+    assignment_id: int,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Obtiene el estado de la entrega del usuario para una tarea.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     user_id = int(current_user["sub"])
     submission = await moodle.get_submission_status(assignment_id, user_id)
 
-    return SubmissionStatusResponse(
+    return json_response(SubmissionStatusResponse(
         status=submission.get("status", "new"),
         graded=submission.get("graded", False),
         grade=submission.get("grade"),
         feedback=submission.get("feedback"),
-    )
+    ))
 
 
 @router.post("/{assignment_id}/submit", response_model=SubmitAssignmentResponse)
@@ -111,17 +152,17 @@ async def submit_assignment(
     assignment_id: int,
     request: SubmitAssignmentRequest,
     current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Envía una entrega de tarea en formato texto.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     user_id = int(current_user["sub"])
     success = await moodle.submit_assignment(assignment_id, user_id, request.text)
 
     if not success:
         raise HTTPException(status_code=400, detail="Error al enviar la entrega")
 
-    return SubmitAssignmentResponse(success=True, message="Entrega enviada exitosamente")
+    return json_response(
+        SubmitAssignmentResponse(success=True, message="Entrega enviada exitosamente")
+    )
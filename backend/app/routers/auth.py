@@ -1,8 +1,11 @@
+import httpx
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from ..services.oauth_service import verify_google_token
-from ..services.moodle_client import MoodleClient
+from ..services.oauth_service import GoogleTokenVerifier, get_google_verifier, verify_google_token
+from ..services.exceptions import MoodleError
+from ..services.moodle_client import MoodleClient, get_moodle_client
+from ..services.prefetch import PrefetchScheduler, get_prefetcher
 from ..utils.security import create_access_token, create_refresh_token, get_current_user, decode_refresh_token
 from ..config import get_settings
 
@@ -45,6 +48,25 @@ class MoodleStatusResponse(BaseModel):
 
 # ==================== Helpers ====================
 
+async def _find_moodle_user(moodle: MoodleClient, email: str) -> dict | None:
+    """Busca el usuario en Moodle; si Moodle falla responde 503 en vez de "no registrado"."""
+    try:
+        return await moodle.get_user_by_email(email)
+    except (MoodleError, httpx.HTTPError):
+        raise HTTPException(
+            status_code=503,
+            detail="No se pudo consultar Moodle. Intenta de nuevo en unos segundos.",
+        )
+
+
+def _schedule_prefetch(
+    prefetcher: PrefetchScheduler | None, moodle: MoodleClient, moodle_user: dict
+) -> None:
+    """Precarga en segundo plano cursos, tareas y contenidos que la app pide al entrar."""
+    if prefetcher is not None:
+        prefetcher.schedule(moodle, int(moodle_user["id"]))
+
+
 async def _create_auth_response(moodle_user: dict, settings) -> TokenResponse:
     """Crea la respuesta de autenticacion con tokens."""
     token_data = {
@@ -70,7 +92,12 @@ async def _create_auth_response(moodle_user: dict, settings) -> TokenResponse:
 # ==================== Endpoints ====================
 
 @router.post("/google", response_model=TokenResponse)
-async def login_with_google(request: GoogleLoginRequest):
+async def login_with_google(
+    request: GoogleLoginRequest,
+    moodle: MoodleClient = Depends(get_moodle_client),
+    google: GoogleTokenVerifier = Depends(get_google_verifier),
+    prefetcher: PrefetchScheduler | None = Depends(get_prefetcher),
+):
     """
     Inicia sesion con Google OAuth.
     Valida el token de Google y verifica que el usuario exista en Moodle.
@@ -78,13 +105,14 @@ async def login_with_google(request: GoogleLoginRequest):
     settings = get_settings()
 
     # Verificar token de Google
-    google_user = await verify_google_token(request.id_token, settings.google_client_id)
+    google_user = await verify_google_token(
+        request.id_token, settings.google_client_id, google
+    )
     if not google_user:
         raise HTTPException(status_code=401, detail="Token de Google invalido")
 
     # Verificar que el usuario exista en Moodle
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-    moodle_user = await moodle.get_user_by_email(google_user["email"])
+    moodle_user = await _find_moodle_user(moodle, google_user["email"])
 
     if not moodle_user:
         raise HTTPException(
@@ -92,11 +120,16 @@ async def login_with_google(request: GoogleLoginRequest):
             detail="Usuario no registrado en Moodle. Contacta al administrador.",
         )
 
+    _schedule_prefetch(prefetcher, moodle, moodle_user)
     return await _create_auth_response(moodle_user, settings)
 
 
 @router.post("/dev-login", response_model=TokenResponse)
-async def dev_login(request: DevLoginRequest = None):
+async def dev_login(
+    request: DevLoginRequest = None,
+    moodle: MoodleClient = Depends(get_moodle_client),
+    prefetcher: PrefetchScheduler | None = Depends(get_prefetcher),
+):
     """
     Login de desarrollo (solo disponible en modo debug).
     Permite autenticarse sin Google OAuth para pruebas locales.
@@ -109,11 +142,9 @@ async def dev_login(request: DevLoginRequest = None):
             detail="Este endpoint solo esta disponible en modo desarrollo",
         )
 
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     # Si se proporciona email, buscar ese usuario
     if request and request.email:
-        moodle_user = await moodle.get_user_by_email(request.email)
+        moodle_user = await _find_moodle_user(moodle, request.email)
         if not moodle_user:
             raise HTTPException(
                 status_code=404,
@@ -128,6 +159,7 @@ async def dev_login(request: DevLoginRequest = None):
             "fullname": site_info.get("fullname", "Admin User"),
         }
 
+    _schedule_prefetch(prefetcher, moodle, moodle_user)
     return await _create_auth_response(moodle_user, settings)
 
 
@@ -175,14 +207,11 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/moodle-status", response_model=MoodleStatusResponse)
-async def check_moodle_connection():
+async def check_moodle_connection(moodle: MoodleClient = Depends(get_moodle_client)):
     """
     Verifica la conexion con el servidor Moodle.
     Util para diagnostico y configuracion inicial.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     try:
         site_info = await moodle.get_site_info()
         return MoodleStatusResponse(
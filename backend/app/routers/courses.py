@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
 from pydantic import BaseModel
-from ..services.moodle_client import MoodleClient
+from ..services.moodle_client import MoodleClient, get_moodle_client
 from ..utils.security import get_current_user
-from ..config import get_settings
+from ..utils.responses import json_response
 
 router = APIRouter(prefix="/courses", tags=["Cursos"])
 
@@ -24,18 +25,73 @@ class CourseContentResponse(BaseModel):
     modules: List[dict] = []
 
 
+def _parse_fields(fields: str | None) -> tuple[set[str] | None, set[str] | None]:
+    """
+    Interpreta `fields=id,name,modules.id,modules.modname`.
+    Retorna los campos de sección y de módulo; None significa "todos".
+    """
+    if not fields:
+        return None, None
+    section_fields = {"id", "name"}
+    module_fields: set[str] = set()
+    for field in fields.split(","):
+        field = field.strip()
+        if field.startswith("modules."):
+            section_fields.add("modules")
+            module_fields.add(field.removeprefix("modules."))
+        elif field:
+            section_fields.add(field)
+    return section_fields, module_fields or None
+
+
+def _project_section(
+    section: dict, section_fields: set[str] | None, module_fields: set[str] | None
+) -> CourseContentResponse:
+    """Construye la sección solo con los campos pedidos."""
+    data = {
+        "id": section.get("id", 0),
+        "name": section.get("name", ""),
+        "summary": section.get("summary"),
+        "modules": section.get("modules", []),
+    }
+    if section_fields is not None:
+        data = {key: value for key, value in data.items() if key in section_fields}
+    if module_fields is not None and "modules" in data:
+        data["modules"] = [
+            {key: value for key, value in module.items() if key in module_fields}
+            for module in data["modules"]
+        ]
+    return CourseContentResponse(**data)
+
+
+async def require_enrolled_course(
+    course_id: int,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
+) -> dict:
+    """
+    Dependencia que verifica que el usuario esté matriculado en el curso.
+    Retorna el registro del curso desde el índice de matrículas.
+    """
+    course_map = await moodle.get_user_course_map(int(current_user["sub"]))
+    course = course_map.get(course_id)
+    if course is None:
+        raise HTTPException(status_code=404, detail="Curso no encontrado")
+    return course
+
+
 @router.get("", response_model=List[CourseResponse])
-async def get_user_courses(current_user: dict = Depends(get_current_user)):
+async def get_user_courses(
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
+):
     """
     Lista todos los cursos en los que el usuario está matriculado.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     user_id = int(current_user["sub"])
     courses = await moodle.get_user_courses(user_id)
 
-    return [
+    return json_response([
         CourseResponse(
             id=course["id"],
             shortname=course.get("shortname", ""),
@@ -45,54 +101,53 @@ async def get_user_courses(current_user: dict = Depends(get_current_user)):
             enddate=course.get("enddate"),
         )
         for course in courses
-    ]
+    ])
 
 
 @router.get("/{course_id}", response_model=CourseResponse)
-async def get_course_detail(
-    course_id: int, current_user: dict = Depends(get_current_user)
-):
+async def get_course_detail(course: dict = Depends(require_enrolled_course)):
     """
     Obtiene el detalle de un curso específico.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
-    user_id = int(current_user["sub"])
-    courses = await moodle.get_user_courses(user_id)
-
-    course = next((c for c in courses if c["id"] == course_id), None)
-    if not course:
-        raise HTTPException(status_code=404, detail="Curso no encontrado")
-
-    return CourseResponse(
+    return json_response(CourseResponse(
         id=course["id"],
         shortname=course.get("shortname", ""),
         fullname=course.get("fullname", ""),
         summary=course.get("summary"),
         startdate=course.get("startdate"),
         enddate=course.get("enddate"),
-    )
+    ))
 
 
-@router.get("/{course_id}/contents", response_model=List[CourseContentResponse])
+@router.get(
+    "/{course_id}/contents",
+    response_model=List[CourseContentResponse],
+    dependencies=[Depends(require_enrolled_course)],
+)
 async def get_course_contents(
-    course_id: int, current_user: dict = Depends(get_current_user)
+    course_id: int,
+    fields: str | None = Query(
+        None, description="Campos a incluir, p. ej. id,name,modules.id,modules.modname"
+    ),
+    format: Literal["json", "ndjson"] = "json",
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Obtiene el contenido (secciones y módulos) de un curso.
+    Con `fields` se recortan secciones y módulos; con `format=ndjson` se
+    emite una sección por línea a medida que se serializa. Los campos que no
+    se pidieron quedan sin asignar y se omiten al serializar (`exclude_unset`).
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     contents = await moodle.get_course_contents(course_id)
+    section_fields, module_fields = _parse_fields(fields)
+    sections = (
+        _project_section(section, section_fields, module_fields) for section in contents
+    )
 
-    return [
-        CourseContentResponse(
-            id=section.get("id", 0),
-            name=section.get("name", ""),
-            summary=section.get("summary"),
-            modules=section.get("modules", []),
+    if format == "ndjson":
+        return StreamingResponse(
+            (section.model_dump_json(exclude_unset=True) + "\n" for section in sections),
+            media_type="application/x-ndjson",
         )
-        for section in contents
-    ]
+    return json_response(list(sections), exclude_unset=True)
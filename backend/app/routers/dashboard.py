@@ -0,0 +1,92 @@
+import asyncio
+import time
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from pydantic import BaseModel
+from ..services.moodle_client import MoodleClient, get_moodle_client
+from ..utils.security import get_current_user
+from ..utils.responses import json_response
+from ..config import get_settings
+from .courses import CourseResponse
+from .assignments import AssignmentResponse, SubmissionStatusResponse
+
+router = APIRouter(prefix="/me", tags=["Dashboard"])
+
+
+class UpcomingAssignmentResponse(AssignmentResponse):
+    submission: SubmissionStatusResponse
+
+
+class DashboardResponse(BaseModel):
+    courses: List[CourseResponse]
+    upcoming_assignments: List[UpcomingAssignmentResponse]
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
+):
+    """
+    Resumen para la pantalla de inicio: cursos, próximas tareas (por fecha de
+    entrega) y el estado de entrega de cada una, en una sola respuesta.
+    """
+    settings = get_settings()
+    user_id = int(current_user["sub"])
+
+    course_map = await moodle.get_user_course_map(user_id)
+    courses = list(course_map.values())
+    by_course = await moodle.get_assignments_by_courses(list(course_map))
+
+    now = int(time.time())
+    upcoming = sorted(
+        (
+            assignment
+            for assignments in by_course.values()
+            for assignment in assignments
+            if assignment.get("duedate", 0) >= now
+        ),
+        key=lambda assignment: assignment["duedate"],
+    )[:limit]
+
+    # Estados de entrega en paralelo, con un límite de llamadas simultáneas
+    semaphore = asyncio.Semaphore(settings.dashboard_concurrency)
+
+    async def fetch_status(assignment: dict) -> dict:
+        async with semaphore:
+            return await moodle.get_submission_status(assignment["id"], user_id)
+
+    statuses = await asyncio.gather(*(fetch_status(a) for a in upcoming))
+
+    return json_response(DashboardResponse(
+        courses=[
+            CourseResponse(
+                id=course["id"],
+                shortname=course.get("shortname", ""),
+                fullname=course.get("fullname", ""),
+                summary=course.get("summary"),
+                startdate=course.get("startdate"),
+                enddate=course.get("enddate"),
+            )
+            for course in courses
+        ],
+        upcoming_assignments=[
+            UpcomingAssignmentResponse(
+                id=assignment["id"],
+                course_id=assignment.get("course", 0),
+                name=assignment.get("name", ""),
+                intro=assignment.get("intro"),
+                duedate=assignment.get("duedate"),
+                allowsubmissionsfromdate=assignment.get("allowsubmissionsfromdate"),
+                grade=assignment.get("grade"),
+                submission=SubmissionStatusResponse(
+                    status=status.get("status", "new"),
+                    graded=status.get("graded", False),
+                    grade=status.get("grade"),
+                    feedback=status.get("feedback"),
+                ),
+            )
+            for assignment, status in zip(upcoming, statuses)
+        ],
+    ))
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal
 from pydantic import BaseModel
-from ..services.moodle_client import MoodleClient
+from ..services.moodle_client import MoodleClient, get_moodle_client
 from ..utils.security import get_current_user
-from ..config import get_settings
+from ..utils.responses import json_response
+from ..utils.pagination import encode_cursor, decode_cursor
+from .courses import require_enrolled_course
 
 router = APIRouter(prefix="/forums", tags=["Foros"])
 
+# Orden de discusiones de Moodle (mod_forum discussion_list::SORTORDER_*)
+DISCUSSION_SORT_ORDERS = {"lastpost": 1, "created": 3}
+
 
 class ForumResponse(BaseModel):
     id: int
@@ -16,6 +21,11 @@ class ForumResponse(BaseModel):
     type: str | None = None
 
 
+class CourseForumsResponse(BaseModel):
+    course_id: int
+    forums: List[ForumResponse] = []
+
+
 class DiscussionResponse(BaseModel):
     id: int
     name: str
@@ -27,6 +37,11 @@ class DiscussionResponse(BaseModel):
     numreplies: int = 0
 
 
+class DiscussionPageResponse(BaseModel):
+    items: List[DiscussionResponse]
+    next_cursor: str | None = None
+
+
 class PostResponse(BaseModel):
     id: int
     discussion_id: int
@@ -37,6 +52,11 @@ class PostResponse(BaseModel):
     created: int | None = None
 
 
+class PostPageResponse(BaseModel):
+    items: List[PostResponse]
+    next_cursor: str | None = None
+
+
 class ReplyRequest(BaseModel):
     message: str
 
@@ -47,19 +67,53 @@ class ReplyResponse(BaseModel):
     message: str
 
 
-@router.get("/course/{course_id}", response_model=List[ForumResponse])
+@router.get("", response_model=List[CourseForumsResponse])
+async def get_all_forums(
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
+):
+    """
+    Lista los foros de todos los cursos del usuario, agrupados por curso.
+    Usa una sola llamada a Moodle para todos los cursos.
+    """
+    user_id = int(current_user["sub"])
+    course_map = await moodle.get_user_course_map(user_id)
+    by_course = await moodle.get_forums_by_courses(list(course_map))
+
+    return json_response([
+        CourseForumsResponse(
+            course_id=course_id,
+            forums=[
+                ForumResponse(
+                    id=forum["id"],
+                    course_id=forum.get("course", course_id),
+                    name=forum.get("name", ""),
+                    intro=forum.get("intro"),
+                    type=forum.get("type"),
+                )
+                for forum in forums
+            ],
+        )
+        for course_id, forums in by_course.items()
+    ])
+
+
+@router.get(
+    "/course/{course_id}",
+    response_model=List[ForumResponse],
+    dependencies=[Depends(require_enrolled_course)],
+)
 async def get_course_forums(
-    course_id: int, current_user: dict = Depends(get_current_user)
+    course_id: int,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Lista todos los foros de un curso.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
     forums = await moodle.get_forums(course_id)
 
-    return [
+    return json_response([
         ForumResponse(
             id=forum["id"],
             course_id=forum.get("course", course_id),
@@ -68,60 +122,95 @@ async def get_course_forums(
             type=forum.get("type"),
         )
         for forum in forums
-    ]
+    ])
 
 
-@router.get("/{forum_id}/discussions", response_model=List[DiscussionResponse])
+@router.get("/{forum_id}/discussions", response_model=DiscussionPageResponse)
 async def get_forum_discussions(
-    forum_id: int, current_user: dict = Depends(get_current_user)
+    forum_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    sort: Literal["lastpost", "created"] = "lastpost",
+    cursor: str | None = None,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
-    Lista las discusiones de un foro.
+    Lista las discusiones de un foro, paginadas.
+    La paginación se delega a Moodle (`page`/`perpage`); `next_cursor` es nulo
+    en la última página.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
-    discussions = await moodle.get_forum_discussions(forum_id)
-
-    return [
-        DiscussionResponse(
-            id=discussion["id"],
-            name=discussion.get("name", ""),
-            message=discussion.get("message"),
-            userid=discussion.get("userid", 0),
-            userfullname=discussion.get("userfullname"),
-            created=discussion.get("created"),
-            modified=discussion.get("modified"),
-            numreplies=discussion.get("numreplies", 0),
-        )
-        for discussion in discussions
-    ]
+    page = 0
+    if cursor:
+        state = decode_cursor(cursor, {"page": 0, "limit": limit, "sort": sort})
+        page, limit, sort = max(state["page"], 0), min(max(state["limit"], 1), 100), state["sort"]
 
+    discussions = await moodle.get_forum_discussions(
+        forum_id, page=page, perpage=limit, sortorder=DISCUSSION_SORT_ORDERS.get(sort, 1)
+    )
 
-@router.get("/discussions/{discussion_id}/posts", response_model=List[PostResponse])
+    next_cursor = None
+    if len(discussions) >= limit:
+        next_cursor = encode_cursor({"page": page + 1, "limit": limit, "sort": sort})
+
+    return json_response(DiscussionPageResponse(
+        items=[
+            DiscussionResponse(
+                # En Moodle `id` es el primer post; `discussion` es el ID de la discusión
+                id=discussion.get("discussion", discussion["id"]),
+                name=discussion.get("name", ""),
+                message=discussion.get("message"),
+                userid=discussion.get("userid", 0),
+                userfullname=discussion.get("userfullname"),
+                created=discussion.get("created"),
+                modified=discussion.get("modified"),
+                numreplies=discussion.get("numreplies", 0),
+            )
+            for discussion in discussions[:limit]
+        ],
+        next_cursor=next_cursor,
+    ))
+
+
+@router.get("/discussions/{discussion_id}/posts", response_model=PostPageResponse)
 async def get_discussion_posts(
-    discussion_id: int, current_user: dict = Depends(get_current_user)
+    discussion_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
-    Obtiene los mensajes de una discusión.
+    Obtiene los mensajes de una discusión en orden cronológico, paginados.
+    Moodle no pagina los posts: el hilo se pide una vez (queda en el cache) y
+    cada página es un corte, así solo se construyen los modelos de la página.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
+    offset = 0
+    if cursor:
+        state = decode_cursor(cursor, {"offset": 0, "limit": limit})
+        offset, limit = max(state["offset"], 0), min(max(state["limit"], 1), 200)
 
     posts = await moodle.get_discussion_posts(discussion_id)
-
-    return [
-        PostResponse(
-            id=post["id"],
-            discussion_id=post.get("discussion", discussion_id),
-            parent_id=post.get("parent", 0),
-            userid=post.get("userid", 0),
-            userfullname=post.get("userfullname"),
-            message=post.get("message", ""),
-            created=post.get("created"),
-        )
-        for post in posts
-    ]
+    page = posts[offset:offset + limit]
+
+    next_cursor = None
+    if offset + limit < len(posts):
+        next_cursor = encode_cursor({"offset": offset + limit, "limit": limit})
+
+    return json_response(PostPageResponse(
+        items=[
+            PostResponse(
+                id=post["id"],
+                discussion_id=post.get("discussion", discussion_id),
+                parent_id=post.get("parent", 0),
+                userid=post.get("userid", 0),
+                userfullname=post.get("userfullname"),
+                message=post.get("message", ""),
+                created=post.get("created"),
+            )
+            for post in page
+        ],
+        next_cursor=next_cursor,
+    ))
 
 
 @router.post("/discussions/{discussion_id}/reply", response_model=ReplyResponse)
@@ -129,24 +218,23 @@ async def reply_to_discussion(
     discussion_id: int,
     request: ReplyRequest,
     current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
 ):
     """
     Publica una respuesta en una discusión.
     """
-    settings = get_settings()
-    moodle = MoodleClient(settings.moodle_url, settings.moodle_token)
-
-    # Obtener el primer post de la discusión para responder
-    posts = await moodle.get_discussion_posts(discussion_id)
-    if not posts:
+    # Responder al primer post de la discusión (índice; el hilo solo en frío)
+    parent_post_id = await moodle.get_first_post_id(discussion_id)
+    if parent_post_id is None:
         raise HTTPException(status_code=404, detail="Discusión no encontrada")
 
-    parent_post_id = posts[0]["id"]
-    result = await moodle.add_discussion_post(parent_post_id, request.message)
+    result = await moodle.add_discussion_post(
+        parent_post_id, request.message, discussion_id=discussion_id
+    )
 
     if not result:
         raise HTTPException(status_code=400, detail="Error al publicar respuesta")
 
-    return ReplyResponse(
+    return json_response(ReplyResponse(
         success=True, post_id=result.get("postid"), message="Respuesta publicada"
-    )
+    ))
@@ -0,0 +1,116 @@
+from typing import Any, Callable
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
+from ..middleware.etag import stats as conditional_get_stats
+from ..services.metrics import REGISTRY
+from ..utils.security import token_cache_stats
+
+router = APIRouter(tags=["Health"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _pool_connections(moodle) -> dict[tuple, int] | None:
+    """Conexiones del pool HTTP hacia Moodle por estado (si el transporte lo expone)."""
+    pool = getattr(getattr(moodle.http_client, "_transport", None), "_pool", None)
+    if pool is None:
+        return None
+    idle = sum(1 for connection in pool.connections if connection.is_idle())
+    return {("idle",): idle, ("active",): len(pool.connections) - idle}
+
+
+def register_app_metrics(app: FastAPI) -> None:
+    """Registra las métricas que se leen del estado de la app al exponerlas."""
+
+    def moodle(read: Callable[[Any], Any], component: str | None = None):
+        def collect():
+            client = getattr(app.state, "moodle", None)
+            if client is None:
+                return None
+            target = getattr(client, component) if component else client
+            return read(target) if target is not None else None
+        return collect
+
+    def stat(component: str, key: str):
+        return moodle(lambda target: target.stats()[key], component)
+
+    REGISTRY.callback("moodle_cache_hits_total", "Aciertos del cache de lecturas de Moodle", stat("cache", "hits"), "counter")
+    REGISTRY.callback("moodle_cache_misses_total", "Fallos del cache de lecturas de Moodle", stat("cache", "misses"), "counter")
+    REGISTRY.callback("moodle_cache_evictions_total", "Entradas expulsadas por tamaño", stat("cache", "evictions"), "counter")
+    REGISTRY.callback("moodle_cache_hit_ratio", "Fracción de aciertos del cache de lecturas", stat("cache", "hit_rate"))
+    REGISTRY.callback("moodle_cache_entries", "Entradas en el cache de lecturas", stat("cache", "entries"))
+    REGISTRY.callback("moodle_cache_bytes", "Bytes en el cache de lecturas", stat("cache", "bytes"))
+    REGISTRY.callback(
+        "http_conditional_get_total",
+        "Respuestas servidas ya serializadas (rendered_hits) y 304 (not_modified)",
+        lambda: {(name,): value for name, value in conditional_get_stats.items()},
+        "counter",
+        ("result",),
+    )
+    REGISTRY.callback("auth_token_cache_hits_total", "Tokens servidos desde el cache de verificados", lambda: token_cache_stats()["hits"], "counter")
+    REGISTRY.callback("auth_token_cache_misses_total", "Tokens verificados con HMAC", lambda: token_cache_stats()["misses"], "counter")
+    REGISTRY.callback("auth_token_cache_entries", "Tokens en el cache de verificados", lambda: token_cache_stats()["entries"])
+    REGISTRY.callback(
+        "moodle_index_entries",
+        "Entradas de los índices en memoria",
+        moodle(lambda client: {(name,): size for name, size in client.index_sizes().items()}),
+        labelnames=("index",),
+    )
+    REGISTRY.callback("moodle_stale_served_total", "Lecturas servidas vencidas", moodle(lambda client: client.stale_served), "counter")
+    REGISTRY.callback("moodle_limiter_limit", "Límite actual de llamadas simultáneas a Moodle", stat("limiter", "limit"))
+    REGISTRY.callback("moodle_limiter_in_flight", "Llamadas a Moodle en curso", stat("limiter", "in_flight"))
+    REGISTRY.callback("moodle_limiter_queued", "Llamadas esperando lugar", stat("limiter", "queued"))
+    REGISTRY.callback("moodle_limiter_rejected_total", "Llamadas rechazadas con la cola llena", stat("limiter", "rejected"), "counter")
+    REGISTRY.callback(
+        "moodle_circuit_open",
+        "Circuitos no cerrados por wsfunction (1 abierto, 0.5 semiabierto)",
+        moodle(
+            lambda breakers: {
+                (function,): 1 if state == "open" else 0.5
+                for function, state in breakers.stats()["open"].items()
+            },
+            "breakers",
+        ),
+        labelnames=("function",),
+    )
+    REGISTRY.callback("moodle_circuit_opens_total", "Aperturas de circuitos", stat("breakers", "opens"), "counter")
+    REGISTRY.callback("moodle_hedges_total", "Peticiones de hedging enviadas", stat("hedger", "hedges"), "counter")
+    REGISTRY.callback("moodle_hedge_wins_total", "Peticiones de hedging que respondieron primero", stat("hedger", "hedge_wins"), "counter")
+    REGISTRY.callback("moodle_retries_total", "Reintentos por errores de conexión", stat("hedger", "retries"), "counter")
+    REGISTRY.callback("moodle_batches_total", "Lotes enviados a Moodle", stat("batcher", "batches"), "counter")
+    REGISTRY.callback("moodle_batched_calls_total", "Llamadas enviadas dentro de lotes", stat("batcher", "batched_calls"), "counter")
+    REGISTRY.callback(
+        "moodle_pool_connections",
+        "Conexiones del pool HTTP hacia Moodle",
+        moodle(_pool_connections),
+        labelnames=("state",),
+    )
+    def prefetch(key: str):
+        def collect():
+            prefetcher = getattr(app.state, "prefetch", None)
+            return prefetcher.stats()[key] if prefetcher is not None else None
+        return collect
+
+    REGISTRY.callback("prefetch_pending", "Precargas post-login pendientes o en curso", prefetch("pending"))
+    REGISTRY.callback("prefetch_completed_total", "Precargas post-login terminadas", prefetch("completed"), "counter")
+    REGISTRY.callback("prefetch_dropped_total", "Precargas descartadas por exceso de pendientes", prefetch("dropped"), "counter")
+    def sync(key: str):
+        def collect():
+            snapshots = getattr(app.state, "snapshots", None)
+            return snapshots.stats()[key] if snapshots is not None else None
+        return collect
+
+    REGISTRY.callback("sync_entities", "Entidades con hash guardado para /sync", sync("entities"))
+    REGISTRY.callback("sync_resets_total", "Sincronizaciones que respondieron todo (reset)", sync("resets"), "counter")
+    REGISTRY.callback(
+        "google_certs_fetches_total",
+        "Descargas de las claves públicas de Google",
+        lambda: app.state.google.fetches if hasattr(app.state, "google") else None,
+        "counter",
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
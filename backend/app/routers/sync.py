@@ -0,0 +1,173 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from pydantic import BaseModel
+from ..middleware.etag import mark_uncacheable
+from ..services.moodle_client import MoodleClient, get_moodle_client
+from ..services.sync import SnapshotStore, SyncEntity, get_snapshot_store
+from ..utils.security import get_current_user
+from ..utils.responses import json_response
+from ..config import get_settings
+from .courses import CourseContentResponse, CourseResponse
+from .assignments import AssignmentResponse
+from .forums import DISCUSSION_SORT_ORDERS, DiscussionResponse, ForumResponse
+
+router = APIRouter(prefix="/sync", tags=["Sincronizacion"])
+
+
+class SectionResponse(CourseContentResponse):
+    course_id: int
+
+
+class SyncDiscussionResponse(DiscussionResponse):
+    forum_id: int
+
+
+class TombstoneResponse(BaseModel):
+    type: str
+    id: int
+    deleted_at: float
+
+
+class SyncResponse(BaseModel):
+    server_time: float
+    reset: bool
+    courses: List[CourseResponse] = []
+    sections: List[SectionResponse] = []
+    assignments: List[AssignmentResponse] = []
+    forums: List[ForumResponse] = []
+    discussions: List[SyncDiscussionResponse] = []
+    deleted: List[TombstoneResponse] = []
+
+
+# Modelo de respuesta por tipo de entidad y lista de SyncResponse donde va
+ENTITY_MODELS = {
+    "course": (CourseResponse, "courses"),
+    "section": (SectionResponse, "sections"),
+    "assignment": (AssignmentResponse, "assignments"),
+    "forum": (ForumResponse, "forums"),
+    "discussion": (SyncDiscussionResponse, "discussions"),
+}
+
+
+async def _collect_entities(
+    moodle: MoodleClient, user_id: int, concurrency: int, discussions_per_forum: int
+) -> tuple[list[SyncEntity], set[str]]:
+    """Vista actual del usuario en Moodle (desde el cache si está vigente)."""
+    course_map = await moodle.get_user_course_map(user_id)
+    course_ids = list(course_map)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(coro):
+        async with semaphore:
+            return await coro
+
+    by_course, forums_by_course, contents = await asyncio.gather(
+        moodle.get_assignments_by_courses(course_ids),
+        moodle.get_forums_by_courses(course_ids),
+        asyncio.gather(*(limited(moodle.get_course_contents(c)) for c in course_ids)),
+    )
+    forums = [forum for course_forums in forums_by_course.values() for forum in course_forums]
+    # Misma página que pide la app al abrir un foro (mismo cache)
+    discussions = await asyncio.gather(*(
+        limited(moodle.get_forum_discussions(
+            forum["id"], page=0, perpage=discussions_per_forum,
+            sortorder=DISCUSSION_SORT_ORDERS["lastpost"],
+        ))
+        for forum in forums
+    ))
+
+    entities = []
+    for course in course_map.values():
+        entities.append(SyncEntity("course", course["id"], None, {
+            "id": course["id"],
+            "shortname": course.get("shortname", ""),
+            "fullname": course.get("fullname", ""),
+            "summary": course.get("summary"),
+            "startdate": course.get("startdate"),
+            "enddate": course.get("enddate"),
+        }, course.get("timemodified")))
+    for course_id, sections in zip(course_ids, contents):
+        for section in sections:
+            entities.append(SyncEntity("section", section.get("id", 0), f"course:{course_id}", {
+                "id": section.get("id", 0),
+                "course_id": course_id,
+                "name": section.get("name", ""),
+                "summary": section.get("summary"),
+                "modules": section.get("modules", []),
+            }))
+    for course_id, assignments in by_course.items():
+        for assignment in assignments:
+            entities.append(SyncEntity("assignment", assignment["id"], f"course:{course_id}", {
+                "id": assignment["id"],
+                "course_id": assignment.get("course", course_id),
+                "name": assignment.get("name", ""),
+                "intro": assignment.get("intro"),
+                "duedate": assignment.get("duedate"),
+                "allowsubmissionsfromdate": assignment.get("allowsubmissionsfromdate"),
+                "grade": assignment.get("grade"),
+            }, assignment.get("timemodified")))
+
+    partial_scopes = set()
+    for forum, page in zip(forums, discussions):
+        course_id = forum.get("course", 0)
+        entities.append(SyncEntity("forum", forum["id"], f"course:{course_id}", {
+            "id": forum["id"],
+            "course_id": course_id,
+            "name": forum.get("name", ""),
+            "intro": forum.get("intro"),
+            "type": forum.get("type"),
+        }, forum.get("timemodified")))
+        if len(page) >= discussions_per_forum:
+            partial_scopes.add(f"forum:{forum['id']}")
+        for discussion in page[:discussions_per_forum]:
+            # En Moodle `id` es el primer post; `discussion` es el ID de la discusión
+            discussion_id = discussion.get("discussion", discussion["id"])
+            entities.append(SyncEntity("discussion", discussion_id, f"forum:{forum['id']}", {
+                "id": discussion_id,
+                "forum_id": forum["id"],
+                "name": discussion.get("name", ""),
+                "message": discussion.get("message"),
+                "userid": discussion.get("userid", 0),
+                "userfullname": discussion.get("userfullname"),
+                "created": discussion.get("created"),
+                "modified": discussion.get("modified"),
+                "numreplies": discussion.get("numreplies", 0),
+            }, discussion.get("timemodified", discussion.get("modified"))))
+    return entities, partial_scopes
+
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    since: float | None = Query(
+        None, description="`server_time` de la sincronización anterior; vacío = todo"
+    ),
+    current_user: dict = Depends(get_current_user),
+    moodle: MoodleClient = Depends(get_moodle_client),
+    snapshots: SnapshotStore = Depends(get_snapshot_store),
+):
+    """
+    Sincronización incremental: cursos, secciones, tareas, foros y últimas
+    discusiones que cambiaron desde `since`, y los que ya no están (`deleted`).
+    Con `reset: true` la respuesta trae todo y el cliente reemplaza su copia.
+    El próximo `since` es el `server_time` de esta respuesta.
+    """
+    settings = get_settings()
+    user_id = int(current_user["sub"])
+    entities, partial_scopes = await _collect_entities(
+        moodle, user_id, settings.sync_concurrency, settings.sync_discussions_per_forum
+    )
+    result = snapshots.diff(user_id, entities, since, partial_scopes)
+    # El resultado depende de la vista anterior del usuario, no solo de Moodle
+    mark_uncacheable()
+
+    response = SyncResponse(server_time=result.server_time, reset=result.reset)
+    for entity in result.changed:
+        model, field = ENTITY_MODELS[entity.kind]
+        getattr(response, field).append(model(**entity.data))
+    for key, deleted_at in result.deleted:
+        kind, _, entity_id = key.partition(":")
+        response.deleted.append(
+            TombstoneResponse(type=kind, id=int(entity_id), deleted_at=deleted_at)
+        )
+    return json_response(response)
@@ -1,4 +1,12 @@
-from .moodle_client import MoodleClient
-from .oauth_service import verify_google_token
+from .moodle_client import MoodleClient, get_moodle_client
+from .http_client import create_http_client
+from .oauth_service import GoogleTokenVerifier, get_google_verifier, verify_google_token
 
-__all__ = ["MoodleClient", "verify_google_token"]
+__all__ = [
+    "MoodleClient",
+    "get_moodle_client",
+    "create_http_client",
+    "GoogleTokenVerifier",
+    "get_google_verifier",
+    "verify_google_token",
+]
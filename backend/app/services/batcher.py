@@ -0,0 +1,118 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable
+from .exceptions import MoodleError
+
+# Códigos con los que Moodle indica que la función no existe o no está en el servicio
+UNAVAILABLE_ERRORCODES = frozenset({"invalidrecord", "servicenotavailable", "accessexception"})
+
+BATCH_FUNCTION = "tool_mobile_call_external_functions"
+
+
+class MoodleBatcher:
+    """
+    Agrupa llamadas a Moodle en una sola petición a `tool_mobile_call_external_functions`.
+
+    Las llamadas que llegan dentro de una ventana corta (o hasta completar
+    `max_size`) se envían juntas y cada llamador recibe su propio resultado o
+    error. Si el sitio no tiene la función, el batcher se desactiva y las
+    llamadas se hacen de forma individual.
+    """
+
+    def __init__(
+        self,
+        send_single: Callable[[str, dict], Awaitable[tuple[Any, int]]],
+        send_batch: Callable[[list[tuple[str, dict]]], Awaitable[list[dict]]],
+        window_ms: float = 3.0,
+        max_size: int = 10,
+    ):
+        self._send_single = send_single
+        self._send_batch = send_batch
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.available = True
+        self._pending: list[tuple[str, dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_calls = 0
+
+    async def submit(self, function: str, params: dict) -> tuple[Any, int]:
+        """Encola una llamada y espera su resultado y tamaño en bytes."""
+        if not self.available:
+            return await self._send_single(function, params)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((function, params, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, dict, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            await self._resolve_single(batch[0])
+            return
+
+        try:
+            responses = await self._send_batch([(f, p) for f, p, _ in batch])
+        except MoodleError as exc:
+            if exc.errorcode in UNAVAILABLE_ERRORCODES:
+                self.available = False
+            await asyncio.gather(*(self._resolve_single(item) for item in batch))
+            return
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        if len(responses) != len(batch):
+            error = MoodleError("Respuesta de lote incompleta")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.batches += 1
+        self.batched_calls += len(batch)
+        for (_, _, future), response in zip(batch, responses):
+            if future.done():
+                continue
+            if response.get("error"):
+                error = json.loads(response.get("exception") or "{}")
+                future.set_exception(MoodleError.from_result(error))
+            else:
+                data = response.get("data") or "null"
+                future.set_result((json.loads(data), len(data)))
+
+    async def _resolve_single(self, item: tuple[str, dict, asyncio.Future]) -> None:
+        function, params, future = item
+        try:
+            result = await self._send_single(function, params)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Contadores de uso del batcher."""
+        return {
+            "available": self.available,
+            "batches": self.batches,
+            "batched_calls": self.batched_calls,
+        }
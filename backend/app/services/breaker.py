@@ -0,0 +1,110 @@
+import math
+import time
+
+import httpx
+from .exceptions import MoodleUnavailable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Fallos que indican un Moodle caído o degradado (red, timeout, 5xx)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de una wsfunction.
+
+    Tras `failure_threshold` fallos seguidos se abre y las llamadas fallan de
+    inmediato durante `reset_timeout` segundos. Después pasa a semiabierto y
+    deja pasar una sola llamada de prueba: si responde se cierra, si falla se
+    vuelve a abrir. Los errores de Moodle en el body (MoodleError) cuentan
+    como respuesta: el servidor está vivo.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: float | None = None
+        self.opens = 0
+
+    def is_open(self) -> bool:
+        """True si las llamadas no deberían ir a Moodle ahora mismo."""
+        return self.state != CLOSED
+
+    def allow(self) -> bool:
+        """Indica si la llamada puede ir a Moodle (en semiabierto, solo una)."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+        # La prueba se da por perdida si no terminó en `reset_timeout`
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def retry_after(self) -> int:
+        """Segundos hasta la próxima prueba."""
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining))
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opens += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+
+    def record_abandoned(self) -> None:
+        """La llamada no llegó a una conclusión (cancelada o rechazada localmente)."""
+        if self.state == HALF_OPEN:
+            self._probe_started = None
+
+    def unavailable(self) -> MoodleUnavailable:
+        return MoodleUnavailable(self.retry_after(), "Moodle no responde, reintentar más tarde")
+
+
+class CircuitBreakers:
+    """Un CircuitBreaker por wsfunction, creado al primer uso."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, function: str) -> CircuitBreaker:
+        breaker = self._breakers.get(function)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self._breakers[function] = breaker
+        return breaker
+
+    def stats(self) -> dict:
+        """Estado de los breakers que no están cerrados, y aperturas totales."""
+        return {
+            "open": {
+                function: breaker.state
+                for function, breaker in self._breakers.items()
+                if breaker.is_open()
+            },
+            "opens": sum(breaker.opens for breaker in self._breakers.values()),
+        }
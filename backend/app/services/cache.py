@@ -0,0 +1,205 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+# Funciones de solo lectura que se pueden cachear y su TTL por defecto (segundos)
+DEFAULT_TTLS: dict[str, float] = {
+    "core_enrol_get_users_courses": 300,
+    "core_course_get_contents": 300,
+    "mod_assign_get_assignments": 300,
+    "mod_assign_get_submission_status": 30,
+    "mod_forum_get_forums_by_courses": 300,
+    "mod_forum_get_forum_discussions": 60,
+    "mod_forum_get_discussion_posts": 30,
+}
+
+MISSING = object()
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+    # Hasta cuándo se conserva vencida para servirla como "stale"
+    stale_until: float
+
+
+class ResponseCache:
+    """
+    Cache TTL/LRU en memoria para respuestas de funciones de Moodle.
+
+    Las claves se construyen con el nombre de la wsfunction y sus parámetros
+    normalizados. Cuando el tamaño total supera `max_bytes` se descartan las
+    entradas menos usadas recientemente.
+
+    Una entrada puede depender de otras (p. ej. una respuesta HTTP ya
+    serializada depende de las llamadas a Moodle con que se construyó): al
+    eliminar una entrada se eliminan también sus dependientes.
+
+    Con `stale_ttl` las entradas sin dependencias se conservan ese tiempo
+    después de vencer: `get` ya no las retorna, pero `get_stale` sí, para
+    servir la última respuesta buena si Moodle está caído o lento.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttls: dict[str, float] | None = None,
+        stale_ttl: float = 0.0,
+    ):
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.stale_ttl = stale_ttl
+        self._entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._size = 0
+        self._dependents: dict[tuple[str, str], set[tuple[str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(function: str, params: dict) -> tuple[str, str]:
+        """Clave estable: función + parámetros ordenados y serializados."""
+        return function, json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+    def ttl_for(self, function: str) -> float | None:
+        """TTL de la función, o None si no es cacheable."""
+        ttl = self.ttls.get(function)
+        return ttl if ttl and ttl > 0 else None
+
+    def get(self, key: tuple[str, str]) -> Any:
+        """Retorna el valor cacheado o `MISSING` si no existe o expiró."""
+        value = self._lookup(key)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key: tuple[str, str]) -> Any:
+        """Como `get`, pero sin contar aciertos ni fallos."""
+        return self._lookup(key)
+
+    def get_stale(self, key: tuple[str, str]) -> Any:
+        """Retorna el valor aunque haya vencido (dentro de `stale_ttl`), o `MISSING`."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        if entry.stale_until <= time.monotonic():
+            self._remove(key)
+            return MISSING
+        return entry.value
+
+    def _lookup(self, key: tuple[str, str]) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        now = time.monotonic()
+        if entry.expires_at <= now:
+            if entry.stale_until <= now:
+                self._remove(key)
+            return MISSING
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(
+        self,
+        key: tuple[str, str],
+        value: Any,
+        size: int,
+        ttl: float,
+        depends_on: list[tuple[str, str]] | None = None,
+    ) -> None:
+        """
+        Guarda un valor con su tamaño aproximado en bytes.
+        Con `depends_on` la entrada no vive más que sus dependencias y se
+        descarta si alguna ya no está en el cache.
+        """
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl
+        for dependency in depends_on or ():
+            entry = self._entries.get(dependency)
+            if entry is None:
+                return
+            expires_at = min(expires_at, entry.expires_at)
+        stale_until = expires_at if depends_on else expires_at + self.stale_ttl
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(value, size, expires_at, stale_until)
+        self._size += size
+        for dependency in depends_on or ():
+            self._dependents.setdefault(dependency, set()).add(key)
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def grow(self, key: tuple[str, str], delta: int) -> None:
+        """Suma bytes a una entrada existente (p. ej. una variante comprimida)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.size += delta
+        self._size += delta
+        while self._size > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, function: str, **params) -> None:
+        """Invalida la entrada exacta de una función con esos parámetros."""
+        key = self.make_key(function, params)
+        if key in self._entries:
+            self._remove(key)
+
+    def expire(self, key: tuple[str, str], at: float | None = None) -> None:
+        """
+        Adelanta el vencimiento de una entrada a `at` (por defecto, ahora): la
+        próxima lectura va a Moodle, pero sigue sirviendo como stale. Las
+        entradas que dependen de ella se descartan.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        at = time.monotonic() if at is None else at
+        if entry.expires_at <= at:
+            return
+        entry.expires_at = at
+        for dependent in self._dependents.pop(key, ()):
+            if dependent in self._entries:
+                self._remove(dependent)
+
+    def invalidate_function(self, function: str) -> None:
+        """Invalida todas las entradas de una función."""
+        for key in [k for k in self._entries if k[0] == function]:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._dependents.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        """Contadores de uso del cache."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        for dependent in self._dependents.pop(key, ()):
+            if dependent in self._entries:
+                self._remove(dependent)
@@ -0,0 +1,31 @@
+class MoodleError(Exception):
+    """Error reportado por Moodle en el cuerpo de la respuesta del webservice."""
+
+    def __init__(self, message: str, errorcode: str | None = None, exception: str | None = None):
+        super().__init__(f"Moodle error: {message}")
+        self.errorcode = errorcode
+        self.exception = exception
+
+    @classmethod
+    def from_result(cls, result: dict) -> "MoodleError":
+        """Construye el error a partir del dict de excepción de Moodle."""
+        return cls(
+            result.get("message", "Unknown error"),
+            errorcode=result.get("errorcode"),
+            exception=result.get("exception"),
+        )
+
+
+class MoodleUnavailable(Exception):
+    """Moodle no está disponible por ahora: se falla rápido sin llamarlo."""
+
+    def __init__(self, retry_after: int = 1, message: str = "Moodle no disponible"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MoodleOverloaded(MoodleUnavailable):
+    """La cola hacia Moodle está llena: se rechaza la llamada sin esperar."""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__(retry_after, "Moodle saturado, reintentar más tarde")
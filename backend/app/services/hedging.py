@@ -0,0 +1,164 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+import httpx
+
+# Errores de conexión que se pueden reintentar en una lectura
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadError,
+    httpx.RemoteProtocolError,
+)
+
+
+class LatencyWindow:
+    """Últimas latencias de una función y su percentil (recalculado cada 16 muestras)."""
+
+    __slots__ = ("samples", "percentile", "_value", "_pending")
+
+    def __init__(self, size: int = 200, percentile: float = 95.0):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.percentile = percentile
+        self._value: float | None = None
+        self._pending = 0
+
+    def add(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._pending += 1
+
+    def value(self, min_samples: int) -> float | None:
+        if len(self.samples) < min_samples:
+            return None
+        if self._value is None or self._pending >= 16:
+            ordered = sorted(self.samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._value = ordered[index]
+            self._pending = 0
+        return self._value
+
+
+class RequestHedger:
+    """
+    Hedging y reintentos para lecturas idempotentes.
+
+    Si la respuesta tarda más que el percentil `percentile` observado para la
+    función, se envía una segunda petición y se usa la que llegue primero (la
+    otra se cancela). Las peticiones extra no superan `max_extra_ratio` de las
+    normales (presupuesto tipo token bucket). Los errores de conexión se
+    reintentan hasta `max_retries` veces con backoff exponencial con jitter,
+    siempre dentro de `deadline` segundos desde el primer intento.
+
+    Solo se usa para funciones de lectura: `MoodleClient` nunca pasa
+    escrituras por aquí.
+    """
+
+    def __init__(
+        self,
+        hedging: bool = True,
+        percentile: float = 95.0,
+        min_delay_ms: float = 20.0,
+        min_samples: int = 20,
+        max_extra_ratio: float = 0.1,
+        max_retries: int = 2,
+        retry_backoff_ms: float = 50.0,
+        deadline: float = 10.0,
+    ):
+        self.hedging = hedging
+        self.percentile = percentile
+        self.min_delay = min_delay_ms / 1000
+        self.min_samples = min_samples
+        self.max_extra_ratio = max_extra_ratio
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.deadline = deadline
+        self._windows: dict[str, LatencyWindow] = {}
+        self._budget = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+
+    async def run(
+        self, function: str, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Envía la petición con hedging y reintentos de conexión."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged(function, send)
+            except RETRYABLE_ERRORS:
+                attempt += 1
+                delay = self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    def hedge_delay(self, function: str) -> float | None:
+        """Espera antes de enviar la segunda petición, o None si aún no hay datos."""
+        window = self._windows.get(function)
+        value = window.value(self.min_samples) if window is not None else None
+        return max(self.min_delay, value) if value is not None else None
+
+    def _window(self, function: str) -> LatencyWindow:
+        window = self._windows.get(function)
+        if window is None:
+            window = self._windows[function] = LatencyWindow(percentile=self.percentile)
+        return window
+
+    async def _hedged(
+        self, function: str, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        self.requests += 1
+        self._budget = min(10.0, self._budget + self.max_extra_ratio)
+        delay = self.hedge_delay(function) if self.hedging else None
+        start = time.monotonic()
+        primary = asyncio.ensure_future(send())
+        tasks = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._budget >= 1:
+                    self._budget -= 1
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(send()))
+            winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if winner is not primary:
+            self.hedge_wins += 1
+        self._window(function).add(time.monotonic() - start)
+        return winner.result()
+
+    @staticmethod
+    async def _first_success(tasks: set[asyncio.Future]) -> asyncio.Future:
+        """La primera petición que responde; si una falla se espera a la otra."""
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+            if not pending:
+                return done.pop()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "extra_load": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "retries": self.retries,
+            "delays_ms": {
+                function: round(delay * 1000, 2)
+                for function in self._windows
+                if (delay := self.hedge_delay(function)) is not None
+            },
+        }
@@ -0,0 +1,22 @@
+import httpx
+from ..config import Settings
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """
+    Crea el cliente HTTP compartido para las llamadas a Moodle.
+
+    Mantiene un pool de conexiones keep-alive para no repetir el handshake
+    TCP/TLS en cada llamada. HTTP/2 es opcional y requiere el paquete `h2`.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.moodle_max_connections,
+        max_keepalive_connections=settings.moodle_max_keepalive_connections,
+        keepalive_expiry=settings.moodle_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        settings.moodle_timeout, connect=settings.moodle_connect_timeout
+    )
+    return httpx.AsyncClient(
+        timeout=timeout, limits=limits, http2=settings.moodle_http2
+    )
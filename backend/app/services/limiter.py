@@ -0,0 +1,126 @@
+import asyncio
+import math
+import time
+from collections import deque
+from .exceptions import MoodleOverloaded
+
+
+class AdaptiveLimiter:
+    """
+    Límite adaptativo (AIMD) de llamadas simultáneas a Moodle.
+
+    El límite sube de a poco (+1 por "ronda" completa de llamadas) mientras la
+    latencia se mantiene cerca de la mejor observada, y baja un 10% cuando
+    supera `tolerance` veces esa referencia o Moodle falla (red, timeout, 5xx), como
+    mucho una vez por latencia de referencia. Las llamadas que no caben esperan
+    en una cola FIFO acotada; con la cola llena, o si la espera supera
+    `queue_timeout`, se rechazan con `MoodleOverloaded`.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        max_queue: int = 100,
+        queue_timeout: float = 5.0,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # Latencia de referencia (mínima observada, que deriva despacio hacia arriba)
+        self._baseline: float | None = None
+        self._last_decrease = 0.0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def saturated(self) -> bool:
+        """Sin lugares libres o con llamadas esperando en la cola."""
+        return bool(self._waiters) or self.in_flight >= int(self.limit)
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se vacíe la cola actual."""
+        latency = self._baseline or 1.0
+        return max(1, math.ceil(len(self._waiters) * latency * self.tolerance / self.limit))
+
+    async def acquire(self) -> None:
+        """Toma un lugar; espera en cola si no hay y falla rápido si la cola está llena."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise MoodleOverloaded(self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            # `release` transfiere el lugar resolviendo el future
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise MoodleOverloaded(self.retry_after())
+        except asyncio.CancelledError:
+            # Cancelado justo después de recibir el lugar: se devuelve
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+    def release(self, latency: float | None = None, overloaded: bool = False) -> None:
+        """
+        Libera el lugar y ajusta el límite: `latency` de una respuesta normal,
+        `overloaded` si Moodle falló por red, timeout o 5xx. Sin ninguno (p. ej.
+        cancelación del cliente) solo libera.
+        """
+        self.in_flight -= 1
+        if overloaded:
+            self._decrease()
+        elif latency is not None:
+            self._observe(latency)
+        self._wake()
+
+    def _observe(self, latency: float) -> None:
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += (latency - self._baseline) * 0.01
+        if latency > self._baseline * self.tolerance:
+            self._decrease()
+        elif self.in_flight + 1 >= int(self.limit):
+            # Solo crece si el límite actual realmente se está usando
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease >= (self._baseline or 0.0):
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._last_decrease = now
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "baseline_ms": round(self._baseline * 1000, 2) if self._baseline else None,
+            "rejected": self.rejected,
+            "queue_timeouts": self.timeouts,
+        }
@@ -0,0 +1,168 @@
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Buckets de latencia (segundos), de 5 ms a 30 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotónico con etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Histograma con buckets fijos y etiquetas (formato Prometheus)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # etiquetas -> [conteo por bucket (no acumulado)..., +Inf, suma]
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        row = self.values.get(labels)
+        if row is None:
+            row = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, row in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), row):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {row[-1]!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Callback:
+    """Métrica leída al momento de exponerla (gauges y contadores ajenos)."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        read: Callable[[], dict[tuple, float] | float | None],
+        labelnames: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.read = read
+        self.labelnames = labelnames
+
+    def samples(self) -> Iterable[str]:
+        values = self.read()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Conjunto de métricas del proceso y su exposición en texto de Prometheus."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | Callback] = {}
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Histogram:
+        return self._add(Histogram(name, help, labelnames))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], dict[tuple, float] | float | None],
+        kind: str = "gauge",
+        labelnames: tuple[str, ...] = (),
+    ) -> Callback:
+        """Registra (o reemplaza) una métrica que se lee al exponer."""
+        metric = Callback(name, help, kind, read, labelnames)
+        self._metrics[name] = metric
+        return metric
+
+    def _add(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = list(metric.samples())
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+http_request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta",
+    ("method", "route", "status"),
+)
+moodle_request_duration = REGISTRY.histogram(
+    "moodle_request_duration_seconds",
+    "Duración de las llamadas a Moodle que no salieron del cache, por wsfunction",
+    ("function",),
+)
+moodle_errors = REGISTRY.counter(
+    "moodle_errors_total",
+    "Errores de Moodle por wsfunction y tipo de excepción",
+    ("function", "exception"),
+)
@@ -1,33 +1,431 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
 import httpx
 from typing import Any
+from fastapi import Request
+from .batcher import BATCH_FUNCTION, MoodleBatcher
+from .breaker import CircuitBreakers, is_upstream_failure
+from .cache import MISSING, ResponseCache
+from .exceptions import MoodleError, MoodleUnavailable
+from .hedging import RequestHedger
+from .limiter import AdaptiveLimiter
+from .metrics import moodle_errors, moodle_request_duration
+from ..utils.timing import timed_upstream
+
+# Funciones idempotentes de solo lectura (se pueden coalescer y cachear)
+READ_FUNCTIONS = frozenset({
+    "core_webservice_get_site_info",
+    "core_user_get_users",
+    "core_enrol_get_users_courses",
+    "core_course_get_contents",
+    "mod_assign_get_assignments",
+    "mod_assign_get_submission_status",
+    "mod_forum_get_forums_by_courses",
+    "mod_forum_get_forum_discussions",
+    "mod_forum_get_discussion_posts",
+})
+
+# Claves de cache de las llamadas hechas durante la petición actual (None si no es cacheable)
+upstream_calls: ContextVar[list | None] = ContextVar("upstream_calls", default=None)
+
+# Funciones servidas desde una respuesta vencida durante la petición actual
+stale_reads: ContextVar[list | None] = ContextVar("stale_reads", default=None)
+
+
+def _encode_params(params: dict, prefix: str = "") -> dict:
+    """Aplana listas y dicts al formato de arrays de PHP (`a[0][b]=...`)."""
+    encoded = {}
+    for name, value in params.items():
+        key = f"{prefix}[{name}]" if prefix else str(name)
+        if isinstance(value, dict):
+            encoded.update(_encode_params(value, key))
+        elif isinstance(value, (list, tuple)):
+            encoded.update(_encode_params(dict(enumerate(value)), key))
+        elif isinstance(value, bool):
+            encoded[key] = int(value)
+        else:
+            encoded[key] = value
+    return encoded
 
 
 class MoodleClient:
     """Cliente HTTP para comunicarse con la API REST de Moodle."""
 
-    def __init__(self, base_url: str, token: str):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        http_client: httpx.AsyncClient | None = None,
+        cache: ResponseCache | None = None,
+        coalesce: bool = True,
+        batching: bool = False,
+        batch_window_ms: float = 3.0,
+        batch_max_size: int = 10,
+        enrolment_ttl: float = 60.0,
+        enrolment_max_users: int = 10000,
+        first_post_max_entries: int = 50000,
+        user_ttl: float = 300.0,
+        user_negative_ttl: float = 30.0,
+        user_max_entries: int = 10000,
+        limiter: AdaptiveLimiter | None = None,
+        breakers: CircuitBreakers | None = None,
+        stale_timeout: float = 2.0,
+        hedger: RequestHedger | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.token = token
         self.webservice_url = f"{self.base_url}/webservice/rest/server.php"
+        # Cliente compartido (pool de conexiones). Si es None se abre uno por llamada.
+        self.http_client = http_client
+        # Cache de respuestas de funciones de solo lectura (opcional)
+        self.cache = cache
+        # Llamadas de lectura en vuelo, compartidas por llamadas idénticas concurrentes
+        self.coalesce = coalesce
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        # Se incrementa en cada invalidación para no guardar lecturas previas a una escritura
+        self._generation = 0
+        # Límite adaptativo de peticiones simultáneas a Moodle (opcional)
+        self.limiter = limiter
+        # Circuit breaker por wsfunction (opcional) y espera máxima antes de servir
+        # una respuesta vencida (requiere un cache con `stale_ttl`)
+        self.breakers = breakers
+        self.stale_timeout = stale_timeout
+        self.stale_served = 0
+        self._background: set[asyncio.Task] = set()
+        # Hedging y reintentos de conexión para lecturas (opcional)
+        self.hedger = hedger
+        # Agrupa lecturas en tool_mobile_call_external_functions (opcional)
+        self.batcher = None
+        if batching:
+            self.batcher = MoodleBatcher(
+                self._request,
+                self._request_batch,
+                window_ms=batch_window_ms,
+                max_size=batch_max_size,
+            )
+        # Índice tarea -> (curso, tarea) y curso -> (expiración, IDs de tareas)
+        self._assignment_index: dict[int, tuple[int, dict]] = {}
+        self._assignment_courses: dict[int, tuple[float, set[int]]] = {}
+        # Índice de matrículas: usuario -> (expiración, {curso -> registro del curso})
+        self.enrolment_ttl = enrolment_ttl
+        self.enrolment_max_users = enrolment_max_users
+        self._enrolments: OrderedDict[int, tuple[float, dict[int, dict]]] = OrderedDict()
+        # Índice discusión -> ID del primer post (para responder sin bajar el hilo)
+        self.first_post_max_entries = first_post_max_entries
+        self._first_posts: OrderedDict[int, int] = OrderedDict()
+        # Índice email -> (expiración, usuario o None si no existe en Moodle)
+        self.user_ttl = user_ttl
+        self.user_negative_ttl = user_negative_ttl
+        self.user_max_entries = user_max_entries
+        self._users: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+        # Índices que se alimentan de cada respuesta upstream de la función
+        self._indexers = {
+            "core_user_get_users": self._index_users,
+            "mod_assign_get_assignments": self._index_assignments,
+            "core_enrol_get_users_courses": self._index_enrolments,
+            "mod_forum_get_forum_discussions": self._index_discussions,
+            "mod_forum_get_discussion_posts": self._index_discussion_posts,
+        }
 
-    async def _call(self, function: str, **params) -> Any:
-        """Realiza una llamada a la API de Moodle."""
+    async def _post(self, data: dict) -> httpx.Response:
+        """Envía el POST al webservice, dentro del límite de concurrencia si existe."""
+        if self.limiter is None:
+            return await self._send(data)
+        await self.limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = await self._send(data)
+        except httpx.TransportError:
+            self.limiter.release(overloaded=True)
+            raise
+        except BaseException:
+            self.limiter.release()
+            raise
+        if response.status_code >= 500:
+            self.limiter.release(overloaded=True)
+        else:
+            self.limiter.release(time.monotonic() - start)
+        return response
+
+    async def _send(self, data: dict) -> httpx.Response:
+        """Envía el POST al webservice reutilizando el pool si existe."""
+        if self.http_client is not None:
+            return await self.http_client.post(self.webservice_url, data=data)
         async with httpx.AsyncClient(timeout=30.0) as client:
-            data = {
-                "wstoken": self.token,
-                "wsfunction": function,
-                "moodlewsrestformat": "json",
-                **params,
-            }
-            response = await client.post(self.webservice_url, data=data)
-            response.raise_for_status()
-            result = response.json()
+            return await client.post(self.webservice_url, data=data)
+
+    async def _call(self, function: str, **params) -> Any:
+        """Realiza una llamada a la API de Moodle, usando el cache si aplica."""
+        ttl = self.cache.ttl_for(function) if self.cache is not None else None
+        key = ResponseCache.make_key(function, params)
+        calls = upstream_calls.get()
+        if calls is not None:
+            calls.append(key if ttl is not None else None)
+        stale = MISSING
+        if ttl is not None:
+            cached = self.cache.get(key)
+            if cached is not MISSING:
+                return cached
+            stale = self.cache.get_stale(key)
 
-            # Moodle retorna errores en el body
-            if isinstance(result, dict) and "exception" in result:
-                raise Exception(f"Moodle error: {result.get('message', 'Unknown error')}")
+        breaker = self.breakers.get(function) if self.breakers is not None else None
+        if breaker is not None and breaker.is_open() and key not in self._inflight:
+            if stale is not MISSING:
+                # Se sirve lo último bueno; si toca, la prueba va en segundo plano
+                if breaker.allow():
+                    self._refresh_in_background(key, function, params, ttl)
+                return self._serve_stale(function, stale)
+            if not breaker.allow():
+                raise breaker.unavailable()
 
-            return result
+        if self.coalesce and function in READ_FUNCTIONS:
+            fetch = self._single_flight(key, function, params, ttl)
+        else:
+            fetch = self._fetch_and_store(key, function, params, ttl)
+        with timed_upstream(function):
+            if stale is MISSING:
+                return await fetch
+            return await self._fetch_or_stale(fetch, function, stale)
+
+    async def _fetch_or_stale(self, fetch, function: str, stale: Any) -> Any:
+        """
+        Espera la respuesta fresca como mucho `stale_timeout`; si tarda más o
+        Moodle falla, sirve la vencida y la llamada sigue en segundo plano.
+        """
+        task = asyncio.ensure_future(fetch)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.stale_timeout)
+        except asyncio.TimeoutError:
+            self._keep_in_background(task)
+            return self._serve_stale(function, stale)
+        except (MoodleUnavailable, httpx.HTTPError) as exc:
+            if isinstance(exc, httpx.HTTPError) and not is_upstream_failure(exc):
+                raise
+            return self._serve_stale(function, stale)
+
+    def _serve_stale(self, function: str, stale: Any) -> Any:
+        self.stale_served += 1
+        reads = stale_reads.get()
+        if reads is not None:
+            reads.append(function)
+        # Una respuesta armada con datos vencidos no se guarda como respuesta HTTP
+        calls = upstream_calls.get()
+        if calls is not None:
+            calls.append(None)
+        return stale
+
+    def _refresh_in_background(
+        self, key: tuple[str, str], function: str, params: dict, ttl: float | None
+    ) -> None:
+        if self.coalesce:
+            task = asyncio.ensure_future(self._single_flight(key, function, params, ttl))
+        else:
+            task = asyncio.ensure_future(self._fetch_and_store(key, function, params, ttl))
+        self._keep_in_background(task)
+
+    def _keep_in_background(self, task: asyncio.Future) -> None:
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Future) -> None:
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _single_flight(
+        self, key: tuple[str, str], function: str, params: dict, ttl: float | None
+    ) -> Any:
+        """
+        Comparte una única llamada upstream entre llamadas idénticas concurrentes.
+
+        La llamada corre en su propia tarea y cada llamador espera con `shield`,
+        así la cancelación de un cliente no cancela la llamada de los demás.
+        Los errores se propagan a todos los que esperaban.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._fetch_and_store(key, function, params, ttl)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight_done(key, t))
+        return await asyncio.shield(task)
+
+    def _inflight_done(self, key: tuple[str, str], task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Marca la excepción como leída aunque todos los llamadores se hayan ido
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_and_store(
+        self, key: tuple[str, str], function: str, params: dict, ttl: float | None
+    ) -> Any:
+        generation = self._generation
+        result, size = await self._fetch(function, params)
+        indexer = self._indexers.get(function)
+        if indexer is not None:
+            indexer(params, result)
+        if ttl is not None and generation == self._generation:
+            self.cache.set(key, result, size, ttl)
+        return result
+
+    async def _fetch(self, function: str, params: dict) -> tuple[Any, int]:
+        """Obtiene el resultado de una función, agrupando lecturas si hay batcher."""
+        breaker = self.breakers.get(function) if self.breakers is not None else None
+        start = time.perf_counter()
+        try:
+            if self.batcher is not None and function in READ_FUNCTIONS:
+                result = await self.batcher.submit(function, params)
+            else:
+                result = await self._request(function, params)
+        except MoodleError as exc:
+            moodle_errors.inc((function, exc.exception or exc.errorcode or "moodle_exception"))
+            # Moodle respondió: el servidor está vivo aunque la llamada falle
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except BaseException as exc:
+            if not isinstance(exc, asyncio.CancelledError):
+                moodle_errors.inc((function, type(exc).__name__))
+            if breaker is not None:
+                if is_upstream_failure(exc):
+                    breaker.record_failure()
+                else:
+                    breaker.record_abandoned()
+            raise
+        finally:
+            moodle_request_duration.observe((function,), time.perf_counter() - start)
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    async def _request(self, function: str, params: dict) -> tuple[Any, int]:
+        """Llama al webservice y retorna el resultado y su tamaño en bytes."""
+        data = {
+            "wstoken": self.token,
+            "wsfunction": function,
+            "moodlewsrestformat": "json",
+            **_encode_params(params),
+        }
+        # Solo lecturas (un lote solo agrupa lecturas): nunca se duplica una escritura
+        if self.hedger is not None and (function in READ_FUNCTIONS or function == BATCH_FUNCTION):
+            response = await self.hedger.run(function, lambda: self._post(data))
+        else:
+            response = await self._post(data)
+        response.raise_for_status()
+        result = response.json()
+
+        # Moodle retorna errores en el body
+        if isinstance(result, dict) and "exception" in result:
+            raise MoodleError.from_result(result)
+
+        return result, len(response.content)
+
+    async def _request_batch(self, calls: list[tuple[str, dict]]) -> list[dict]:
+        """Ejecuta varias funciones en una sola petición y retorna las respuestas crudas."""
+        requests = [
+            {"function": function, "arguments": json.dumps(params)}
+            for function, params in calls
+        ]
+        result, _ = await self._request(BATCH_FUNCTION, {"requests": requests})
+        return result.get("responses", [])
+
+    def _invalidate(self, function: str, **params) -> None:
+        """Invalida una entrada del cache (sin parámetros, toda la función)."""
+        self._generation += 1
+        # Las lecturas en vuelo ya no sirven a los llamadores posteriores a la escritura
+        if params:
+            self._inflight.pop(ResponseCache.make_key(function, params), None)
+        else:
+            for key in [k for k in self._inflight if k[0] == function]:
+                del self._inflight[key]
+        if self.cache is None:
+            return
+        if params:
+            self.cache.invalidate(function, **params)
+        else:
+            self.cache.invalidate_function(function)
+
+    def _index_assignments(self, params: dict, result: dict) -> None:
+        """Reemplaza en el índice las tareas de cada curso de la respuesta."""
+        ttl = self.cache.ttl_for("mod_assign_get_assignments") if self.cache else None
+        expires_at = time.monotonic() + (ttl or 300)
+        for course in result.get("courses", []):
+            course_id = course.get("id")
+            _, previous = self._assignment_courses.get(course_id, (0, set()))
+            for assignment_id in previous:
+                self._assignment_index.pop(assignment_id, None)
+            ids = set()
+            for assignment in course.get("assignments", []):
+                self._assignment_index[assignment["id"]] = (course_id, assignment)
+                ids.add(assignment["id"])
+            self._assignment_courses[course_id] = (expires_at, ids)
+
+    def _lookup_assignment(self, assignment_id: int) -> tuple[int, dict] | None:
+        """Busca una tarea en el índice: (curso, tarea); None si no está o su curso expiró."""
+        entry = self._assignment_index.get(assignment_id)
+        if entry is None:
+            return None
+        expires_at, _ = self._assignment_courses.get(entry[0], (0, set()))
+        if expires_at <= time.monotonic():
+            return None
+        return entry
+
+    def _index_users(self, params: dict, result: dict) -> None:
+        """Guarda el usuario encontrado por email, o su ausencia por menos tiempo."""
+        criteria = params.get("criteria", [])
+        if len(criteria) != 1 or criteria[0]["key"] != "email":
+            return
+        users = result.get("users", [])
+        user = users[0] if users else None
+        ttl = self.user_ttl if user is not None else self.user_negative_ttl
+        email = criteria[0]["value"]
+        self._users[email] = (time.monotonic() + ttl, user)
+        self._users.move_to_end(email)
+        while len(self._users) > self.user_max_entries:
+            self._users.popitem(last=False)
+
+    def _index_enrolments(self, params: dict, result: list) -> dict[int, dict]:
+        """Guarda los cursos de un usuario indexados por ID."""
+        user_id = params["userid"]
+        course_map = {course["id"]: course for course in result}
+        self._enrolments[user_id] = (time.monotonic() + self.enrolment_ttl, course_map)
+        self._enrolments.move_to_end(user_id)
+        while len(self._enrolments) > self.enrolment_max_users:
+            self._enrolments.popitem(last=False)
+        return course_map
+
+    def _remember_first_post(self, discussion_id: int, post_id: int) -> None:
+        self._first_posts[discussion_id] = post_id
+        self._first_posts.move_to_end(discussion_id)
+        while len(self._first_posts) > self.first_post_max_entries:
+            self._first_posts.popitem(last=False)
+
+    def _index_discussions(self, params: dict, result: dict) -> None:
+        """En la lista de discusiones `id` es el primer post y `discussion` la discusión."""
+        for discussion in result.get("discussions", []):
+            if "discussion" in discussion:
+                self._remember_first_post(discussion["discussion"], discussion["id"])
+
+    def _index_discussion_posts(self, params: dict, result: dict) -> None:
+        """El primer post de un hilo es el que no tiene padre."""
+        for post in result.get("posts", []):
+            if not post.get("parent"):
+                self._remember_first_post(params["discussionid"], post["id"])
+                break
+
+    def index_sizes(self) -> dict[str, int]:
+        """Entradas de cada índice en memoria (para métricas)."""
+        return {
+            "assignments": len(self._assignment_index),
+            "enrolments": len(self._enrolments),
+            "first_posts": len(self._first_posts),
+            "users": len(self._users),
+        }
 
     # ==================== Usuarios ====================
 
@@ -36,15 +434,23 @@ class MoodleClient:
         return await self._call("core_webservice_get_site_info")
 
     async def get_user_by_email(self, email: str) -> dict | None:
-        """Busca un usuario por email."""
-        try:
-            result = await self._call(
-                "core_user_get_users", criteria=[{"key": "email", "value": email}]
-            )
-            users = result.get("users", [])
-            return users[0] if users else None
-        except Exception:
-            return None
+        """
+        Busca un usuario por email. Retorna None solo si Moodle no lo tiene.
+
+        Los encontrados se recuerdan `user_ttl` segundos y los inexistentes
+        `user_negative_ttl`; búsquedas concurrentes del mismo email comparten
+        la llamada. Los errores de Moodle o de red se propagan (MoodleError,
+        httpx.HTTPError) y nunca se guardan como "no registrado".
+        """
+        email = email.strip().lower()
+        entry = self._users.get(email)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        result = await self._call(
+            "core_user_get_users", criteria=[{"key": "email", "value": email}]
+        )
+        users = result.get("users", [])
+        return users[0] if users else None
 
     # ==================== Cursos ====================
 
@@ -52,6 +458,42 @@ class MoodleClient:
         """Obtiene los cursos de un usuario."""
         return await self._call("core_enrol_get_users_courses", userid=user_id)
 
+    async def get_user_course_map(self, user_id: int) -> dict[int, dict]:
+        """
+        Obtiene los cursos de un usuario indexados por ID.
+
+        Se consulta Moodle como mucho una vez por `enrolment_ttl` por usuario;
+        el resto de búsquedas y comprobaciones de matrícula son accesos al dict.
+        Al vencer, la respuesta cacheada de `core_enrol_get_users_courses` se
+        da por vencida (más vieja que el índice) para que la matrícula se
+        vuelva a pedir a Moodle.
+        """
+        key = ResponseCache.make_key("core_enrol_get_users_courses", {"userid": user_id})
+        entry = self._enrolments.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._depend_on_enrolments(key, entry[0])
+            return entry[1]
+        if self.cache is not None:
+            self.cache.expire(key)
+        courses = await self.get_user_courses(user_id)
+        course_map = self._index_enrolments({"userid": user_id}, courses)
+        self._depend_on_enrolments(key, time.monotonic() + self.enrolment_ttl)
+        return course_map
+
+    def _depend_on_enrolments(self, key: tuple[str, str], expires_at: float) -> None:
+        """
+        Registra la matrícula como dependencia de la respuesta actual aunque se
+        haya resuelto con el índice, y hace que la entrada cacheada no viva más
+        que él: las respuestas guardadas que pasaron por la comprobación de
+        matrícula vencen junto con ella.
+        """
+        if self.cache is None:
+            return
+        self.cache.expire(key, expires_at)
+        calls = upstream_calls.get()
+        if calls is not None:
+            calls.append(key)
+
     async def get_course_contents(self, course_id: int) -> list:
         """Obtiene el contenido de un curso (secciones y módulos)."""
         return await self._call("core_course_get_contents", courseid=course_id)
@@ -66,15 +508,44 @@ class MoodleClient:
             return courses[0].get("assignments", [])
         return []
 
-    async def get_assignment_by_id(self, assignment_id: int) -> dict | None:
-        """Obtiene una tarea por ID."""
-        # Moodle no tiene un endpoint directo, hay que buscar en todos los cursos
-        # Por simplicidad, usamos get_assignments con el course_id del cache
-        # En producción, esto debería optimizarse
-        return None  # TODO: Implementar búsqueda por ID
+    async def get_assignments_by_courses(self, course_ids: list[int]) -> dict[int, list]:
+        """Obtiene las tareas de varios cursos en una sola llamada, agrupadas por curso."""
+        if not course_ids:
+            return {}
+        result = await self._call(
+            "mod_assign_get_assignments", courseids=sorted(course_ids)
+        )
+        grouped = {course_id: [] for course_id in course_ids}
+        for course in result.get("courses", []):
+            grouped[course["id"]] = course.get("assignments", [])
+        return grouped
+
+    async def get_assignment_by_id(self, assignment_id: int, user_id: int) -> dict | None:
+        """
+        Obtiene una tarea por ID.
+
+        Moodle no tiene un endpoint directo: se consulta el índice que se llena
+        con cada respuesta de `mod_assign_get_assignments` y, si no está, se
+        piden de una vez las tareas de todos los cursos del usuario. El índice
+        es compartido: solo se entrega la tarea si el usuario está inscrito en
+        su curso.
+        """
+        course_map = await self.get_user_course_map(user_id)
+        entry = self._lookup_assignment(assignment_id)
+        if entry is None:
+            await self.get_assignments_by_courses(list(course_map))
+            entry = self._lookup_assignment(assignment_id)
+        if entry is None or entry[0] not in course_map:
+            return None
+        return entry[1]
 
     async def get_submission_status(self, assignment_id: int, user_id: int) -> dict:
-        """Obtiene el estado de la entrega de un usuario."""
+        """
+        Obtiene el estado de la entrega de un usuario. Si no se pudo obtener
+        (error del webservice o de red, respuesta incompleta) se toma como "sin
+        entregar", para que una llamada que falla no tumbe el dashboard. Con el
+        circuito abierto o la cola llena se propaga `MoodleUnavailable` (503).
+        """
         try:
             result = await self._call(
                 "mod_assign_get_submission_status",
@@ -90,7 +561,7 @@ class MoodleClient:
                 "grade": grade_info.get("gradefordisplay"),
                 "feedback": grade_info.get("feedbackplugins", [{}])[0].get("editorfields", [{}])[0].get("text"),
             }
-        except Exception:
+        except (MoodleError, httpx.HTTPError, KeyError, IndexError, AttributeError):
             return {"status": "new", "graded": False}
 
     async def submit_assignment(
@@ -104,7 +575,15 @@ class MoodleClient:
                 assignmentid=assignment_id,
                 plugindata={"onlinetext_editor": {"text": text, "format": 1, "itemid": 0}},
             )
+            self._invalidate(
+                "mod_assign_get_submission_status",
+                assignid=assignment_id,
+                userid=user_id,
+            )
             return True
+        except MoodleUnavailable:
+            # Circuito abierto o cola llena: 503 con Retry-After, no "error al enviar"
+            raise
         except Exception:
             return False
 
@@ -114,19 +593,60 @@ class MoodleClient:
         """Obtiene los foros de un curso."""
         return await self._call("mod_forum_get_forums_by_courses", courseids=[course_id])
 
-    async def get_forum_discussions(self, forum_id: int) -> list:
-        """Obtiene las discusiones de un foro."""
-        result = await self._call("mod_forum_get_forum_discussions", forumid=forum_id)
+    async def get_forums_by_courses(self, course_ids: list[int]) -> dict[int, list]:
+        """Obtiene los foros de varios cursos en una sola llamada, agrupados por curso."""
+        if not course_ids:
+            return {}
+        forums = await self._call(
+            "mod_forum_get_forums_by_courses", courseids=sorted(course_ids)
+        )
+        grouped = {course_id: [] for course_id in course_ids}
+        for forum in forums:
+            grouped.setdefault(forum.get("course"), []).append(forum)
+        return grouped
+
+    async def get_forum_discussions(
+        self,
+        forum_id: int,
+        page: int | None = None,
+        perpage: int | None = None,
+        sortorder: int | None = None,
+    ) -> list:
+        """Obtiene las discusiones de un foro (una página si se indica `page`)."""
+        params = {"forumid": forum_id}
+        if page is not None:
+            params.update(page=page, perpage=perpage or 0)
+        if sortorder is not None:
+            params["sortorder"] = sortorder
+        result = await self._call("mod_forum_get_forum_discussions", **params)
         return result.get("discussions", [])
 
     async def get_discussion_posts(self, discussion_id: int) -> list:
-        """Obtiene los mensajes de una discusión."""
+        """Obtiene los mensajes de una discusión en orden cronológico."""
         result = await self._call(
-            "mod_forum_get_discussion_posts", discussionid=discussion_id
+            "mod_forum_get_discussion_posts",
+            discussionid=discussion_id,
+            sortby="created",
+            sortdirection="ASC",
         )
         return result.get("posts", [])
 
-    async def add_discussion_post(self, post_id: int, message: str) -> dict | None:
+    async def get_first_post_id(self, discussion_id: int) -> int | None:
+        """
+        Obtiene el ID del primer post de una discusión.
+
+        Se toma del índice que llenan las listas de discusiones; solo si no
+        está se descargan los mensajes del hilo.
+        """
+        post_id = self._first_posts.get(discussion_id)
+        if post_id is not None:
+            return post_id
+        await self.get_discussion_posts(discussion_id)
+        return self._first_posts.get(discussion_id)
+
+    async def add_discussion_post(
+        self, post_id: int, message: str, discussion_id: int | None = None
+    ) -> dict | None:
         """Añade una respuesta a un post."""
         try:
             result = await self._call(
@@ -135,6 +655,26 @@ class MoodleClient:
                 subject="Re:",
                 message=message,
             )
+            # Sin el ID de la discusión no sabemos qué hilo cambió
+            if discussion_id is not None:
+                self._invalidate(
+                    "mod_forum_get_discussion_posts",
+                    discussionid=discussion_id,
+                    sortby="created",
+                    sortdirection="ASC",
+                )
+            else:
+                self._invalidate("mod_forum_get_discussion_posts")
+            # El contador de respuestas de la lista de discusiones también cambia
+            self._invalidate("mod_forum_get_forum_discussions")
             return result
+        except MoodleUnavailable:
+            # Circuito abierto o cola llena: 503 con Retry-After, no "error al publicar"
+            raise
         except Exception:
             return None
+
+
+def get_moodle_client(request: Request) -> MoodleClient:
+    """Dependencia que entrega el cliente de Moodle compartido por la app."""
+    return request.app.state.moodle
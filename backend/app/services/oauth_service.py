@@ -1,34 +1,147 @@
-from google.oauth2 import id_token
-from google.auth.transport import requests
+import asyncio
+import re
+import time
 
+import httpx
+from fastapi import Request
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 
-async def verify_google_token(token: str, client_id: str) -> dict | None:
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _cache_ttl(response: httpx.Response, default: float) -> float:
+    """Segundos de validez según Cache-Control (max-age menos Age)."""
+    cache_control = response.headers.get("cache-control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0.0
+    match = _MAX_AGE.search(cache_control)
+    if not match:
+        return default
+    age = response.headers.get("age", "0")
+    return max(0.0, int(match.group(1)) - (int(age) if age.isdigit() else 0))
+
+
+class GoogleTokenVerifier:
+    """
+    Verifica ID tokens de Google localmente con las claves públicas en cache.
+
+    Las claves (JWKS) se descargan con el cliente HTTP async compartido y se
+    guardan el tiempo que indica el Cache-Control de la respuesta; una sola
+    descarga atiende a todos los logins concurrentes. Si llega un `kid`
+    desconocido (Google rotó sus claves) se vuelve a descargar, como mucho una
+    vez cada `min_refresh_interval` segundos. La verificación de la firma RSA
+    se hace fuera del event loop.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        certs_url: str = GOOGLE_CERTS_URL,
+        default_ttl: float = 300.0,
+        min_refresh_interval: float = 30.0,
+    ):
+        self.http_client = http_client
+        self.certs_url = certs_url
+        self.default_ttl = default_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, Key] = {}
+        self._expires_at = 0.0
+        self._fetched_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.fetches = 0
+
+    async def get_keys(self, force: bool = False) -> dict[str, Key]:
+        """Claves públicas vigentes por `kid`, descargándolas si caducaron."""
+        if not force and time.monotonic() < self._expires_at:
+            return self._keys
+        async with self._lock:
+            now = time.monotonic()
+            if force:
+                if now - self._fetched_at < self.min_refresh_interval:
+                    return self._keys
+            elif now < self._expires_at:
+                return self._keys
+            try:
+                await self._refresh()
+            except httpx.HTTPError:
+                # Sin red hacia Google se sigue con las claves anteriores
+                if not self._keys:
+                    raise
+        return self._keys
+
+    async def _refresh(self) -> None:
+        response = await self.http_client.get(self.certs_url)
+        response.raise_for_status()
+        self.fetches += 1
+        keys = {}
+        for key_data in response.json()["keys"]:
+            keys[key_data["kid"]] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + _cache_ttl(response, self.default_ttl)
+
+    async def verify(self, token: str, client_id: str) -> dict:
+        """Claims del token si la firma, `aud`, `iss` y `exp` son válidos; si no, ValueError."""
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise ValueError(str(e)) from e
+
+        kid = header.get("kid")
+        keys = await self.get_keys()
+        if kid not in keys:
+            keys = await self.get_keys(force=True)
+        key = keys.get(kid)
+        if key is None:
+            raise ValueError(f"Clave de Google desconocida: {kid}")
+
+        try:
+            return await asyncio.to_thread(
+                jwt.decode,
+                token,
+                key,
+                algorithms=["RS256"],
+                audience=client_id,
+                issuer=GOOGLE_ISSUERS,
+                options={"verify_at_hash": False},
+            )
+        except JWTError as e:
+            raise ValueError(str(e)) from e
+
+
+def get_google_verifier(request: Request) -> GoogleTokenVerifier:
+    """Dependencia que entrega el verificador de Google compartido por la app."""
+    return request.app.state.google
+
+
+async def verify_google_token(
+    token: str, client_id: str, verifier: GoogleTokenVerifier
+) -> dict | None:
     """
     Verifica un token de Google OAuth y retorna la información del usuario.
 
     Args:
         token: El ID token de Google
         client_id: El Client ID de Google OAuth
+        verifier: Verificador con las claves públicas de Google en cache
 
     Returns:
         Dict con email, name, picture si es válido, None si no
     """
     try:
-        # Verificar el token con Google
-        idinfo = id_token.verify_oauth2_token(
-            token, requests.Request(), client_id
-        )
-
-        # Verificar que el token sea de nuestro cliente
-        if idinfo["aud"] != client_id:
-            return None
-
-        return {
-            "email": idinfo.get("email"),
-            "name": idinfo.get("name"),
-            "picture": idinfo.get("picture"),
-            "email_verified": idinfo.get("email_verified", False),
-        }
+        idinfo = await verifier.verify(token, client_id)
     except ValueError:
         # Token inválido
         return None
+
+    return {
+        "email": idinfo.get("email"),
+        "name": idinfo.get("name"),
+        "picture": idinfo.get("picture"),
+        "email_verified": idinfo.get("email_verified", False),
+    }
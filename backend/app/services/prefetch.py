@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import OrderedDict
+from fastapi import Request
+from .moodle_client import MoodleClient
+
+
+def _warm_order(courses: list[dict], now: float) -> list[dict]:
+    """Cursos en curso primero (sin fecha de fin o sin terminar), los más nuevos antes."""
+    return sorted(
+        courses,
+        key=lambda course: (
+            bool(course.get("enddate")) and course["enddate"] < now,
+            -(course.get("startdate") or 0),
+        ),
+    )
+
+
+class PrefetchScheduler:
+    """
+    Precarga en segundo plano lo que la app pide justo después del login:
+    matrículas, tareas de todos los cursos y contenidos de los primeros
+    `max_courses`, que quedan en el cache de lecturas de Moodle.
+
+    Es global al proceso: como mucho `max_concurrency` warm-ups a la vez (cada
+    uno hace sus llamadas de a una) y `max_pending` esperando; lo que no cabe se
+    descarta. Un usuario no se vuelve a precargar antes de `cooldown` segundos,
+    cada warm-up se corta al pasar `budget` segundos, y se deja de precargar
+    si el limitador hacia Moodle está saturado: el tráfico real tiene prioridad.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_pending: int = 100,
+        max_courses: int = 5,
+        budget: float = 10.0,
+        cooldown: float = 300.0,
+        max_users: int = 10000,
+    ):
+        self.max_pending = max_pending
+        self.max_courses = max_courses
+        self.budget = budget
+        self.cooldown = cooldown
+        self.max_users = max_users
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        # Usuario -> momento hasta el que no se vuelve a precargar
+        self._recent: OrderedDict[int, float] = OrderedDict()
+        self.scheduled = 0
+        self.completed = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.failed = 0
+        self.reads = 0
+
+    def schedule(self, moodle: MoodleClient, user_id: int) -> bool:
+        """Agenda la precarga del usuario; retorna False si se omitió o descartó."""
+        now = time.monotonic()
+        until = self._recent.get(user_id)
+        if until is not None and until > now:
+            self.skipped += 1
+            return False
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._recent[user_id] = now + self.cooldown
+        self._recent.move_to_end(user_id)
+        if len(self._recent) > self.max_users:
+            self._recent.popitem(last=False)
+        task = asyncio.ensure_future(self._run(moodle, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.scheduled += 1
+        return True
+
+    async def _run(self, moodle: MoodleClient, user_id: int) -> None:
+        async with self._semaphore:
+            try:
+                await self._warm(moodle, user_id, time.monotonic() + self.budget)
+            except Exception:
+                # Es solo una optimización: si Moodle falla, la app pedirá lo suyo
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def _can_continue(self, moodle: MoodleClient, deadline: float) -> bool:
+        if time.monotonic() >= deadline:
+            return False
+        return moodle.limiter is None or not moodle.limiter.saturated()
+
+    async def _warm(self, moodle: MoodleClient, user_id: int, deadline: float) -> None:
+        course_map = await moodle.get_user_course_map(user_id)
+        self.reads += 1
+        if not course_map or not self._can_continue(moodle, deadline):
+            return
+        # Mismos parámetros que /assignments y /me/dashboard: misma entrada de cache
+        await moodle.get_assignments_by_courses(list(course_map))
+        self.reads += 1
+        for course in _warm_order(list(course_map.values()), time.time())[: self.max_courses]:
+            if not self._can_continue(moodle, deadline):
+                return
+            await moodle.get_course_contents(course["id"])
+            self.reads += 1
+
+    async def close(self) -> None:
+        """Cancela las precargas pendientes (al apagar)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Contadores de la precarga."""
+        return {
+            "pending": len(self._tasks),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "reads": self.reads,
+        }
+
+
+def get_prefetcher(request: Request) -> PrefetchScheduler | None:
+    """Dependencia que entrega el programador de precargas (None si está desactivado)."""
+    return getattr(request.app.state, "prefetch", None)
@@ -0,0 +1,180 @@
+import hashlib
+import time
+from collections import OrderedDict
+from fastapi import Request
+import orjson
+
+
+class SyncEntity:
+    """
+    Entidad sincronizable: tipo, ID, contenedor (`course:2`, `forum:20`),
+    datos tal como se envían al cliente y `timemodified` de Moodle si lo tiene.
+    """
+
+    __slots__ = ("kind", "id", "scope", "data", "timestamp")
+
+    def __init__(self, kind: str, id: int, scope: str | None, data: dict, timestamp: int | None = None):
+        self.kind = kind
+        self.id = id
+        self.scope = scope
+        self.data = data
+        self.timestamp = timestamp
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.id}"
+
+
+class _UserView:
+    """Lo que vio un usuario en su última sincronización."""
+
+    __slots__ = ("created", "visible", "tombstones")
+
+    def __init__(self, created: float):
+        self.created = created
+        # clave -> (contenedor, momento desde el que el usuario la ve)
+        self.visible: dict[str, tuple[str | None, float]] = {}
+        # clave -> momento en que dejó de verla
+        self.tombstones: dict[str, float] = {}
+
+
+class SyncResult:
+    __slots__ = ("reset", "changed", "deleted", "server_time")
+
+    def __init__(self, reset: bool, changed: list[SyncEntity], deleted: list[tuple[str, float]], server_time: float):
+        self.reset = reset
+        self.changed = changed
+        self.deleted = deleted
+        self.server_time = server_time
+
+
+class SnapshotStore:
+    """
+    Detecta qué cambió desde `since` para la sincronización incremental.
+
+    Moodle no expone fecha de cambio para todo (las secciones de un curso no
+    la tienen) ni avisa de borrados, así que se guarda un hash por entidad y
+    el momento (del servidor) en que se vio cambiar. Si la entidad trae
+    `timemodified` y coincide con el último visto, no se vuelve a hashear. Los
+    hashes son globales (el contenido de un curso es el mismo para todos);
+    por usuario se guarda qué entidades ve y desde cuándo, y las que dejó de
+    ver (tombstones) durante `tombstone_ttl`.
+
+    Si no hay vista previa del usuario, o `since` es anterior a ella o a los
+    tombstones retenidos, se responde todo con `reset` para que el cliente
+    reemplace su copia.
+    """
+
+    def __init__(
+        self,
+        tombstone_ttl: float = 7 * 86400,
+        max_users: int = 10000,
+        max_entities: int = 200000,
+    ):
+        self.tombstone_ttl = tombstone_ttl
+        self.max_users = max_users
+        self.max_entities = max_entities
+        # clave -> (timemodified, hash, momento del último cambio)
+        self._entities: OrderedDict[str, tuple[int | None, bytes, float]] = OrderedDict()
+        self._users: OrderedDict[int, _UserView] = OrderedDict()
+        self.hashed = 0
+        self.resets = 0
+
+    def _changed_at(self, entity: SyncEntity, now: float) -> float:
+        """Momento en que se vio cambiar la entidad (ahora si es nueva o distinta)."""
+        key = entity.key
+        known = self._entities.get(key)
+        if known is not None and entity.timestamp is not None and known[0] == entity.timestamp:
+            self._entities.move_to_end(key)
+            return known[2]
+        self.hashed += 1
+        digest = hashlib.blake2b(
+            orjson.dumps(entity.data, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).digest()
+        if known is not None and known[1] == digest:
+            changed_at = known[2]
+        else:
+            changed_at = now
+        self._entities[key] = (entity.timestamp, digest, changed_at)
+        self._entities.move_to_end(key)
+        if len(self._entities) > self.max_entities:
+            self._entities.popitem(last=False)
+        return changed_at
+
+    def diff(
+        self,
+        user_id: int,
+        entities: list[SyncEntity],
+        since: float | None,
+        partial_scopes: set[str] = frozenset(),
+    ) -> SyncResult:
+        """
+        Cambios y borrados para el usuario desde `since`. En `partial_scopes`
+        van los contenedores de los que solo se vio una parte (p. ej. las
+        últimas discusiones de un foro): lo que falta ahí no se da por borrado.
+        """
+        now = time.time()
+        view = self._users.get(user_id)
+        reset = (
+            since is None
+            or view is None
+            or since < view.created
+            or since < now - self.tombstone_ttl
+        )
+        if view is None:
+            view = _UserView(now)
+            self._users[user_id] = view
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+
+        changed = []
+        visible = {}
+        for entity in entities:
+            key = entity.key
+            changed_at = self._changed_at(entity, now)
+            previous = view.visible.get(key)
+            visible_since = previous[1] if previous is not None else now
+            visible[key] = (entity.scope, visible_since)
+            view.tombstones.pop(key, None)
+            if reset or max(changed_at, visible_since) > since:
+                changed.append(entity)
+
+        for key, (scope, _) in view.visible.items():
+            if key in visible:
+                continue
+            if scope in partial_scopes and scope in visible:
+                # Sigue existiendo, solo quedó fuera de la parte que se mira
+                visible[key] = view.visible[key]
+                continue
+            view.tombstones[key] = now
+        view.visible = visible
+
+        horizon = now - self.tombstone_ttl
+        view.tombstones = {
+            key: deleted_at for key, deleted_at in view.tombstones.items() if deleted_at > horizon
+        }
+        deleted = []
+        if not reset:
+            deleted = [
+                (key, deleted_at)
+                for key, deleted_at in view.tombstones.items()
+                if deleted_at > since
+            ]
+        else:
+            self.resets += 1
+            view.created = now
+        return SyncResult(reset, changed, deleted, now)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._users),
+            "entities": len(self._entities),
+            "hashed": self.hashed,
+            "resets": self.resets,
+        }
+
+
+def get_snapshot_store(request: Request) -> SnapshotStore:
+    """Dependencia que entrega el almacén de snapshots compartido por la app."""
+    return request.app.state.snapshots
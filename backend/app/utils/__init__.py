@@ -4,10 +4,15 @@ from .security import (
     decode_refresh_token,
     get_current_user,
 )
+from .pagination import encode_cursor, decode_cursor
+from .responses import json_response
 
 __all__ = [
     "create_access_token",
     "create_refresh_token",
     "decode_refresh_token",
     "get_current_user",
+    "encode_cursor",
+    "decode_cursor",
+    "json_response",
 ]
@@ -0,0 +1,22 @@
+import base64
+import json
+from fastapi import HTTPException
+
+
+def encode_cursor(data: dict) -> str:
+    """Codifica el estado de paginación en un token opaco para el cliente."""
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, defaults: dict) -> dict:
+    """
+    Decodifica un token de paginación sobre los valores por defecto.
+    Cada valor se convierte al tipo del valor por defecto; 400 si no es válido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return {key: type(value)(data.get(key, value)) for key, value in defaults.items()}
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor invalido")
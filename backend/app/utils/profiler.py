@@ -0,0 +1,97 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+
+def _fold(frame: FrameType) -> str:
+    """Pila desde la raíz, en formato "plegado" (`a;b;c`) de flamegraph/speedscope."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profile:
+    """Muestras de pila tomadas mientras corre una petición."""
+
+    __slots__ = ("task", "samples")
+
+    def __init__(self, task: asyncio.Task | None):
+        self.task = task
+        self.samples: Counter = Counter()
+
+    def dump(self, path: Path) -> Path:
+        """Escribe las muestras (`pila cantidad` por línea, de más a menos frecuente)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = (f"{stack} {count}\n" for stack, count in self.samples.most_common())
+        path.write_text("".join(lines))
+        return path
+
+
+class SamplingProfiler:
+    """
+    Profiler por muestreo del hilo del event loop.
+
+    Mientras haya peticiones perfiladas, un hilo toma la pila del loop cada
+    `interval_ms` (sin instrumentar las llamadas, el costo no depende del
+    código perfilado). Como el loop atiende varias peticiones a la vez, cada
+    muestra empieza con `request` si corría la tarea de la petición,
+    `other_task` si corría otra (otras peticiones, tareas de `gather`,
+    llamadas compartidas) o `idle` si el loop esperaba I/O.
+    """
+
+    def __init__(self, interval_ms: float = 5.0):
+        self.interval = interval_ms / 1000
+        self._profiles: set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+
+    def start(self) -> Profile:
+        """Empieza a perfilar la tarea actual (llamar desde el event loop)."""
+        profile = Profile(asyncio.current_task())
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self) -> None:
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+                loop, loop_thread = self._loop, self._loop_thread
+            frame = sys._current_frames().get(loop_thread)
+            if frame is None:
+                continue
+            stack = _fold(frame)
+            current = current_tasks.get(loop)
+            for profile in profiles:
+                if current is None:
+                    root = "idle"
+                elif current is profile.task:
+                    root = "request"
+                else:
+                    root = "other_task"
+                profile.samples[f"{root};{stack}"] += 1
@@ -0,0 +1,36 @@
+from typing import Any
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+from .timing import timed
+
+
+def json_response(
+    content: Any,
+    *,
+    exclude_unset: bool = False,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    Serializa con orjson y retorna la respuesta ya construida.
+
+    Al retornar un `Response`, FastAPI no vuelve a validar el contenido contra
+    `response_model` ni lo pasa por `jsonable_encoder`: los modelos se validan
+    una sola vez, al construirlos en el endpoint. `response_model` se mantiene
+    en el decorador para la documentación OpenAPI.
+    """
+
+    def default(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return value.model_dump(exclude_unset=exclude_unset)
+        raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+    with timed("serialize"):
+        body = orjson.dumps(content, default=default)
+    return Response(
+        body,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
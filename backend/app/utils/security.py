@@ -1,9 +1,14 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
-from jose import jwt, JWTError
+from typing import Any, Callable, Optional
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ..config import get_settings
+from .timing import timed
 
 security = HTTPBearer()
 
@@ -11,60 +16,145 @@ security = HTTPBearer()
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 
+# ==================== Claves y cache de tokens ====================
+
+class _JWTKeys:
+    """Clave ya construida, algoritmo y duración del access token."""
+
+    __slots__ = ("key", "algorithm", "expiration_minutes")
+
+    def __init__(self, secret: str, algorithm: str, expiration_minutes: int):
+        self.key: Key = jwk.construct(secret, algorithm)
+        self.algorithm = algorithm
+        self.expiration_minutes = expiration_minutes
+
+
+_keys: Optional[_JWTKeys] = None
+
+# Hash del token -> (exp, payload) de access tokens ya verificados, en orden LRU
+_verified: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+_verified_max_entries = 10000
+_verified_counts = {"hits": 0, "misses": 0}
+_flush_listeners: list[Callable[[], None]] = []
+
+
+def configure_jwt(
+    secret: str,
+    algorithm: str,
+    expiration_minutes: int,
+    max_cached_tokens: int = 10000,
+) -> None:
+    """
+    Prepara la clave de firma (una vez, al iniciar). Llamarla de nuevo con otro
+    secreto es la forma de rotarlo: vacía el cache de tokens verificados.
+    """
+    global _keys, _verified_max_entries
+    _keys = _JWTKeys(secret, algorithm, expiration_minutes)
+    _verified_max_entries = max_cached_tokens
+    flush_token_cache()
+
+
+def _jwt_keys() -> _JWTKeys:
+    """Clave configurada; si no se llamó a `configure_jwt`, la toma de Settings."""
+    if _keys is None:
+        settings = get_settings()
+        configure_jwt(
+            settings.jwt_secret,
+            settings.jwt_algorithm,
+            settings.jwt_expiration_minutes,
+            settings.auth_cache_max_entries,
+        )
+    return _keys
+
+
+def flush_token_cache() -> None:
+    """Olvida los tokens verificados (p. ej. al rotar el secreto) y avisa a los interesados."""
+    _verified.clear()
+    for listener in _flush_listeners:
+        listener()
+
+
+def on_token_flush(listener: Callable[[], None]) -> None:
+    """Registra una función a llamar cuando se vacía el cache de tokens."""
+    _flush_listeners.append(listener)
+
+
+def token_cache_stats() -> dict:
+    """Tamaño y aciertos del cache de tokens verificados."""
+    return {"entries": len(_verified), "max_entries": _verified_max_entries, **_verified_counts}
+
+
+# ==================== Tokens ====================
+
 def create_access_token(data: dict[str, Any]) -> str:
     """Crea un token JWT de acceso con los datos proporcionados."""
-    settings = get_settings()
+    keys = _jwt_keys()
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expiration_minutes)
+    expire = datetime.now(timezone.utc) + timedelta(minutes=keys.expiration_minutes)
     to_encode.update({
         "exp": expire,
         "type": "access"
     })
-    return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+    return jwt.encode(to_encode, keys.key, algorithm=keys.algorithm)
 
 
 def create_refresh_token(data: dict[str, Any]) -> str:
     """Crea un token JWT de refresh con duracion extendida."""
-    settings = get_settings()
+    keys = _jwt_keys()
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({
         "exp": expire,
         "type": "refresh"
     })
-    return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+    return jwt.encode(to_encode, keys.key, algorithm=keys.algorithm)
 
 
 def decode_access_token(token: str) -> dict:
-    """Decodifica y valida un token JWT de acceso."""
-    settings = get_settings()
+    """
+    Decodifica y valida un token JWT de acceso.
+    Los tokens ya verificados se sirven desde un LRU hasta su `exp`.
+    """
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _verified.get(digest)
+    if cached is not None:
+        exp, payload = cached
+        if time.time() < exp:
+            _verified.move_to_end(digest)
+            _verified_counts["hits"] += 1
+            return dict(payload)
+        del _verified[digest]
+    _verified_counts["misses"] += 1
+
+    keys = _jwt_keys()
     try:
-        payload = jwt.decode(
-            token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
-        )
-        # Verificar que sea un token de acceso
-        if payload.get("type") != "access":
-            raise HTTPException(
-                status_code=401,
-                detail="Tipo de token invalido",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return payload
+        payload = jwt.decode(token, keys.key, algorithms=[keys.algorithm])
     except JWTError:
         raise HTTPException(
             status_code=401,
             detail="Token invalido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Verificar que sea un token de acceso
+    if payload.get("type") != "access":
+        raise HTTPException(
+            status_code=401,
+            detail="Tipo de token invalido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if "exp" in payload:
+        _verified[digest] = (payload["exp"], payload)
+        if len(_verified) > _verified_max_entries:
+            _verified.popitem(last=False)
+    return dict(payload)
 
 
 def decode_refresh_token(token: str) -> Optional[dict]:
     """Decodifica y valida un refresh token. Retorna None si es invalido."""
-    settings = get_settings()
+    keys = _jwt_keys()
     try:
-        payload = jwt.decode(
-            token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
-        )
+        payload = jwt.decode(token, keys.key, algorithms=[keys.algorithm])
         # Verificar que sea un refresh token
         if payload.get("type") != "refresh":
             return None
@@ -78,4 +168,5 @@ async def get_current_user(
 ) -> dict:
     """Obtiene el usuario actual a partir del token JWT."""
     token = credentials.credentials
-    return decode_access_token(token)
+    with timed("auth"):
+        return decode_access_token(token)
@@ -0,0 +1,100 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class RequestTiming:
+    """
+    Tiempos de una petición por fase, para el header `Server-Timing`.
+
+    `upstream` es el tiempo de pared con al menos una llamada a Moodle en curso
+    (las llamadas en paralelo no se suman); el detalle por wsfunction sí suma
+    la duración de cada llamada. `transform` es lo que resta: lógica del
+    endpoint, armado de modelos y middlewares.
+    """
+
+    __slots__ = ("start", "phases", "functions", "upstream", "_active", "_since")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        # wsfunction -> [llamadas, segundos]
+        self.functions: dict[str, list] = {}
+        self.upstream = 0.0
+        self._active = 0
+        self._since = 0.0
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def upstream_started(self) -> float:
+        now = time.perf_counter()
+        if self._active == 0:
+            self._since = now
+        self._active += 1
+        return now
+
+    def upstream_finished(self, function: str, started: float) -> None:
+        now = time.perf_counter()
+        self._active -= 1
+        if self._active == 0:
+            self.upstream += now - self._since
+        entry = self.functions.setdefault(function, [0, 0.0])
+        entry[0] += 1
+        entry[1] += now - started
+
+    def header(self) -> bytes:
+        """Valor del header, con duraciones en milisegundos."""
+        total = time.perf_counter() - self.start
+        metrics = []
+        known = self.upstream
+        if "auth" in self.phases:
+            metrics.append(f"auth;dur={self.phases['auth'] * 1000:.2f}")
+            known += self.phases["auth"]
+        if self.functions:
+            calls = sum(count for count, _ in self.functions.values())
+            metrics.append(f'upstream;dur={self.upstream * 1000:.2f};desc="llamadas: {calls}"')
+            for function, (count, seconds) in self.functions.items():
+                metrics.append(f'upstream.{function};dur={seconds * 1000:.2f};desc="llamadas: {count}"')
+        for phase in ("serialize", "compress"):
+            if phase in self.phases:
+                known += self.phases[phase]
+        metrics.append(f"transform;dur={max(0.0, total - known) * 1000:.2f}")
+        for phase in ("serialize", "compress"):
+            if phase in self.phases:
+                metrics.append(f"{phase};dur={self.phases[phase] * 1000:.2f}")
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics).encode()
+
+
+# Tiempos de la petición actual (None fuera de ServerTimingMiddleware)
+request_timing: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Suma el tiempo del bloque a la fase `phase` de la petición actual."""
+    timing = request_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - start)
+
+
+@contextmanager
+def timed_upstream(function: str) -> Iterator[None]:
+    """Registra una llamada a Moodle (fuera del cache) de la petición actual."""
+    timing = request_timing.get()
+    if timing is None:
+        yield
+        return
+    started = timing.upstream_started()
+    try:
+        yield
+    finally:
+        timing.upstream_finished(function, started)
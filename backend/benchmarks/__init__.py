@@ -0,0 +1 @@
+# Benchmarks locales contra un Moodle simulado
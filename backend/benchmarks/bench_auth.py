@@ -0,0 +1,65 @@
+"""
+Costo de autenticación por petición.
+
+Compara la verificación completa del JWT en cada petición (como antes) con
+el cache de tokens verificados de `decode_access_token`, para un grupo de
+usuarios que repiten su token (varias peticiones por pantalla).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_auth --users 50 --requests 20000
+"""
+import argparse
+import json
+import random
+import time
+
+from jose import jwt
+
+from app.config import get_settings
+from app.utils import security
+
+
+def _legacy_decode(token: str) -> dict:
+    """Ruta anterior: get_settings() y verificación HMAC en cada llamada."""
+    settings = get_settings()
+    payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    if payload.get("type") != "access":
+        raise ValueError("Tipo de token invalido")
+    return payload
+
+
+def _time(fn, tokens: list[str]) -> float:
+    start = time.perf_counter()
+    for token in tokens:
+        fn(token)
+    return (time.perf_counter() - start) / len(tokens) * 1e6
+
+
+def main(args) -> dict:
+    users = [
+        security.create_access_token(
+            {"sub": str(i), "email": f"u{i}@test.com", "fullname": f"Usuario {i}"}
+        )
+        for i in range(args.users)
+    ]
+    rng = random.Random(0)
+    tokens = [rng.choice(users) for _ in range(args.requests)]
+
+    legacy_us = _time(_legacy_decode, tokens)
+    security.flush_token_cache()
+    cached_us = _time(security.decode_access_token, tokens)
+    return {
+        "users": args.users,
+        "requests": args.requests,
+        "full_verify_us": round(legacy_us, 2),
+        "cached_us": round(cached_us, 2),
+        "speedup": round(legacy_us / cached_us, 1),
+        "cache": security.token_cache_stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20000)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,75 @@
+"""
+Mide las idas y vueltas a Moodle de una pantalla compuesta con y sin batching.
+
+La "pantalla" pide en paralelo el contenido, las tareas y los foros de cada
+curso del usuario, como haría la app al abrir el inicio.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_batching --screens 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.moodle_client import MoodleClient
+from .common import fake_moodle_server, summarize
+
+
+async def _screen(moodle: MoodleClient) -> None:
+    courses = await moodle.get_user_courses(3)
+    calls = []
+    for course in courses:
+        calls.append(moodle.get_course_contents(course["id"]))
+        calls.append(moodle.get_assignments(course["id"]))
+        calls.append(moodle.get_forums(course["id"]))
+    await asyncio.gather(*calls)
+
+
+async def _drive(url: str, args, batching: bool) -> dict:
+    async with httpx.AsyncClient() as http_client:
+        await http_client.post(f"{url}/__reset")
+        moodle = MoodleClient(
+            url,
+            "token",
+            http_client=http_client,
+            coalesce=False,
+            batching=batching,
+            batch_window_ms=args.window_ms,
+            batch_max_size=args.max_size,
+        )
+        latencies: list[float] = []
+        remaining = iter(range(args.screens))
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                await _screen(moodle)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = (await http_client.get(f"{url}/__stats")).json()
+        return {**summarize(latencies, elapsed), "upstream_round_trips": stats["_round_trips"]}
+
+
+async def main(args) -> dict:
+    with fake_moodle_server(port=args.port, latency_ms=args.latency_ms) as url:
+        return {
+            "individual": await _drive(url, args, batching=False),
+            "batched": await _drive(url, args, batching=True),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--screens", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--window-ms", type=float, default=3.0)
+    parser.add_argument("--max-size", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,82 @@
+"""
+Compresión: CPU vs bytes.
+
+1. Por codificación y nivel: tiempo de compresión y tamaño para un payload
+   real de `/courses/{id}/contents`.
+2. De punta a punta: GET repetidos con `Accept-Encoding`, sin cache (cada
+   petición llama a Moodle, serializa y comprime) vs sirviendo la variante ya
+   comprimida del cache.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_compression --sections 30 --repeats 300
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.middleware.compression import (
+    CACHED_LEVELS,
+    DYNAMIC_LEVELS,
+    available_encodings,
+    compress,
+)
+from .common import app_client, summarize, wire_bytes
+from .fake_moodle import FakeMoodle
+
+PATH = "/courses/2/contents"
+
+
+def _codecs(body: bytes, rounds: int) -> dict:
+    results = {"identity": {"bytes": len(body)}}
+    for encoding in available_encodings(["br", "zstd", "gzip"]):
+        for label, cached in (("dynamic", False), ("cached", True)):
+            levels = CACHED_LEVELS if cached else DYNAMIC_LEVELS
+            start = time.perf_counter()
+            for _ in range(rounds):
+                compressed = compress(body, encoding, cached=cached)
+            elapsed = time.perf_counter() - start
+            results[f"{encoding}-{label}(level {levels[encoding]})"] = {
+                "bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "compress_us": round(elapsed / rounds * 1e6, 1),
+            }
+    return results
+
+
+async def _end_to_end(fake: FakeMoodle, encoding: str, repeats: int, cached: bool) -> dict:
+    options = {} if cached else {"cache": None}
+    async with app_client(fake, **options) as client:
+        headers = {"Accept-Encoding": encoding}
+        await client.get(PATH, headers=headers)
+        latencies: list[float] = []
+        total_bytes = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            response = await client.get(PATH, headers=headers)
+            latencies.append(time.perf_counter() - t0)
+            total_bytes += wire_bytes(response)
+        return {**summarize(latencies, time.perf_counter() - start), "bytes": total_bytes}
+
+
+async def main(args) -> dict:
+    fake = FakeMoodle(latency_ms=0, sections=args.sections, modules_per_section=10)
+    async with app_client(fake) as client:
+        body = (await client.get(PATH, headers={"Accept-Encoding": "identity"})).content
+
+    end_to_end = {}
+    for encoding in ["identity", *available_encodings(["br", "zstd", "gzip"])]:
+        end_to_end[encoding] = {
+            "uncached": await _end_to_end(fake, encoding, args.repeats, cached=False),
+            "precompressed": await _end_to_end(fake, encoding, args.repeats, cached=True),
+        }
+    return {"codecs": _codecs(body, args.rounds), "end_to_end": end_to_end}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=50)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,62 @@
+"""
+Bytes en el cable al repetir lecturas con y sin revalidación (If-None-Match).
+
+Para cada endpoint hace una primera carga y luego N repeticiones: una vez
+pidiendo el cuerpo completo y otra revalidando con el ETag recibido (304).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_etag --repeats 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import app_client, summarize, wire_bytes
+from .fake_moodle import FakeMoodle
+
+ENDPOINTS = [
+    "/courses",
+    "/courses/2/contents",
+    "/assignments/course/2",
+    "/forums/course/2",
+    "/forums/20/discussions",
+    "/forums/discussions/2001/posts",
+]
+
+
+async def _repeat(client, path: str, repeats: int, etag: str | None) -> dict:
+    headers = {"If-None-Match": etag} if etag else {}
+    latencies: list[float] = []
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        total_bytes += wire_bytes(response)
+    return {**summarize(latencies, time.perf_counter() - start), "bytes": total_bytes}
+
+
+async def main(args) -> dict:
+    fake = FakeMoodle(latency_ms=0, sections=args.sections, posts_per_discussion=args.posts)
+    results = {}
+    async with app_client(fake) as client:
+        for path in ENDPOINTS:
+            first = await client.get(path)
+            full = await _repeat(client, path, args.repeats, None)
+            revalidated = await _repeat(client, path, args.repeats, first.headers.get("etag"))
+            results[path] = {
+                "full": full,
+                "revalidated": revalidated,
+                "bytes_saved_pct": round(100 * (1 - revalidated["bytes"] / full["bytes"]), 1),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--posts", type=int, default=50)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,106 @@
+"""
+Tormenta de logins con Google contra un servidor de claves simulado.
+
+Compara la verificación anterior (descarga síncrona de las claves en cada
+login y firma verificada en el event loop) con `GoogleTokenVerifier` (claves
+en cache según Cache-Control y firma fuera del loop). Además de la latencia
+de los logins mide el retraso del event loop, que es lo que sufren las demás
+peticiones del worker mientras tanto.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_google_login --logins 300 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from jose import jwk, jwt
+
+from app.services.oauth_service import GOOGLE_ISSUERS, GoogleTokenVerifier
+from .common import fake_google_server, percentile, summarize
+from .fake_google import FakeGoogleCerts, generate_private_key
+
+CLIENT_ID = "bench.apps.googleusercontent.com"
+
+
+async def _legacy_verify(certs_url: str, token: str) -> dict:
+    """Como antes: descarga bloqueante de las claves y verificación en el loop."""
+    keys = httpx.get(certs_url).json()["keys"]
+    kid = jwt.get_unverified_header(token)["kid"]
+    key_data = next(k for k in keys if k["kid"] == kid)
+    return jwt.decode(
+        token,
+        jwk.construct(key_data, "RS256"),
+        algorithms=["RS256"],
+        audience=CLIENT_ID,
+        issuer=GOOGLE_ISSUERS,
+    )
+
+
+async def _storm(verify, tokens: list[str], concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def login(token):
+        async with semaphore:
+            start = time.perf_counter()
+            await verify(token)
+            latencies.append(time.perf_counter() - start)
+
+    ticker = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    await asyncio.gather(*(login(t) for t in tokens))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker
+    return {
+        **summarize(latencies, elapsed),
+        "loop_lag_p99_ms": round(percentile(lags, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+    }
+
+
+async def main(args) -> dict:
+    private_key = generate_private_key()
+    issuer = FakeGoogleCerts(private_key=private_key)
+    tokens = [issuer.id_token(f"u{i}@test.com", CLIENT_ID) for i in range(args.logins)]
+
+    results = {}
+    with fake_google_server(
+        port=args.port, private_key=private_key, latency_ms=args.latency_ms
+    ) as url:
+        certs_url = f"{url}/oauth2/v3/certs"
+        async with httpx.AsyncClient() as client:
+            results["blocking"] = await _storm(
+                lambda t: _legacy_verify(certs_url, t), tokens, args.concurrency
+            )
+            before = (await client.get(f"{url}/__stats")).json()["fetches"]
+
+            verifier = GoogleTokenVerifier(client, certs_url)
+            results["cached_keys"] = await _storm(
+                lambda t: verifier.verify(t, CLIENT_ID), tokens, args.concurrency
+            )
+            after = (await client.get(f"{url}/__stats")).json()["fetches"]
+
+    results["blocking"]["key_fetches"] = before
+    results["cached_keys"]["key_fetches"] = after - before
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8766)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
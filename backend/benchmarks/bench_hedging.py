@@ -0,0 +1,109 @@
+"""
+Latencia de cola de lecturas con y sin hedging, y reintentos de conexión.
+
+El Moodle simulado responde en `--latency-ms`, salvo una fracción
+`--tail-ratio` de llamadas que caen en un worker lento (`--tail-ms`). Con
+hedging, las lecturas que superan el p95 observado se duplican y se usa la
+primera respuesta; la carga extra queda acotada por `--max-ratio`. Además se
+mide una red que corta `--error-rate` de las conexiones, con y sin reintentos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_hedging --requests 2000 --tail-ratio 0.03
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from app.services.hedging import RequestHedger
+from app.services.moodle_client import MoodleClient
+from .common import summarize
+from .fake_moodle import FakeMoodle
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """Transporte que falla la conexión en una fracción de las peticiones."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, error_rate: float):
+        self.inner = inner
+        self.error_rate = error_rate
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if random.random() < self.error_rate:
+            raise httpx.ConnectError("conexión rechazada (simulada)")
+        return await self.inner.handle_async_request(request)
+
+
+async def _run(args, hedger: RequestHedger | None, error_rate: float = 0.0) -> dict:
+    fake = FakeMoodle(
+        latency_ms=args.latency_ms,
+        tail_ratio=args.tail_ratio,
+        tail_ms=args.tail_ms,
+        courses=args.courses,
+    )
+    transport = FlakyTransport(httpx.ASGITransport(app=fake.app()), error_rate)
+    async with httpx.AsyncClient(transport=transport) as http_client:
+        moodle = MoodleClient(
+            "http://fake-moodle", "token", http_client=http_client, coalesce=False, hedger=hedger
+        )
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies: list[float] = []
+        errors = 0
+
+        async def one(n: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await moodle.get_course_contents(2 + n % args.courses)
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    result = {**summarize(latencies, elapsed), "errors": errors, "upstream_calls": fake.round_trips}
+    if hedger is not None:
+        result["hedger"] = hedger.stats()
+    return result
+
+
+def _hedger(args, hedging: bool, retries: int) -> RequestHedger:
+    return RequestHedger(
+        hedging=hedging,
+        max_extra_ratio=args.max_ratio,
+        max_retries=retries,
+        min_delay_ms=args.latency_ms,
+    )
+
+
+async def main(args) -> dict:
+    return {
+        "slow_tail": {
+            "plain": await _run(args, None),
+            "hedged": await _run(args, _hedger(args, hedging=True, retries=0)),
+        },
+        "flaky_network": {
+            "plain": await _run(args, None, args.error_rate),
+            "retries": await _run(args, _hedger(args, hedging=False, retries=2), args.error_rate),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--tail-ratio", type=float, default=0.03)
+    parser.add_argument("--tail-ms", type=float, default=300.0)
+    parser.add_argument("--max-ratio", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
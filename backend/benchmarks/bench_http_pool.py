@@ -0,0 +1,56 @@
+"""
+Compara el cliente por llamada contra el cliente con pool compartido.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_http_pool --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.config import Settings
+from app.services.http_client import create_http_client
+from app.services.moodle_client import MoodleClient
+from .common import fake_moodle_server, summarize
+
+
+async def _drive(moodle: MoodleClient, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await moodle.get_course_contents(2)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def main(args) -> dict:
+    with fake_moodle_server(port=args.port, latency_ms=args.latency_ms) as url:
+        results = {}
+        per_call = MoodleClient(url, "token")
+        results["per_call"] = await _drive(per_call, args.requests, args.concurrency)
+
+        settings = Settings(moodle_url=url, moodle_http2=args.http2)
+        http_client = create_http_client(settings)
+        try:
+            pooled = MoodleClient(url, "token", http_client=http_client)
+            results["pooled"] = await _drive(pooled, args.requests, args.concurrency)
+        finally:
+            await http_client.aclose()
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--http2", action="store_true")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
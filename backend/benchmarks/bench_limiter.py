@@ -0,0 +1,90 @@
+"""
+Ráfaga de peticiones contra un Moodle con pocos procesos PHP-FPM.
+
+Sin límite, todas las llamadas llegan a Moodle a la vez, hacen cola allí y la
+latencia crece para todos. Con `AdaptiveLimiter` la concurrencia hacia Moodle
+se ajusta a lo que responde bien, el exceso espera en una cola acotada y lo
+que no cabe recibe 503 + Retry-After de inmediato.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_limiter --requests 1000 --concurrency 100 --workers 16
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.limiter import AdaptiveLimiter
+from .common import app_client, fake_moodle_server, percentile, summarize
+
+
+async def _burst(args, url: str, limiter: AdaptiveLimiter | None) -> dict:
+    latencies: list[float] = []
+    rejected: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient() as admin:
+        await admin.post(f"{url}/__reset")
+    async with app_client(url, cache=None, limiter=limiter) as client:
+        # Calienta el índice de matrículas para medir solo la carga de contenidos
+        await client.get("/courses")
+
+        async def one(n: int):
+            async with semaphore:
+                course_id = 2 + n % args.courses
+                start = time.perf_counter()
+                response = await client.get(f"/courses/{course_id}/contents")
+                elapsed = time.perf_counter() - start
+                (latencies if response.status_code == 200 else rejected).append(elapsed)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    async with httpx.AsyncClient() as admin:
+        fake_stats = (await admin.get(f"{url}/__stats")).json()
+    result = {
+        **summarize(latencies, elapsed),
+        "rejected_503": len(rejected),
+        "rejected_p99_ms": round(percentile(rejected, 99) * 1000, 2),
+        "moodle_peak_in_flight": fake_stats["_peak_in_flight"],
+    }
+    if limiter is not None:
+        result["limiter"] = limiter.stats()
+    return result
+
+
+async def main(args) -> dict:
+    with fake_moodle_server(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        workers=args.workers,
+        courses=args.courses,
+    ) as url:
+        return {
+            "unlimited": await _burst(args, url, None),
+            "adaptive": await _burst(
+                args,
+                url,
+                AdaptiveLimiter(
+                    initial_limit=args.workers,
+                    max_queue=args.queue,
+                    queue_timeout=args.queue_timeout,
+                ),
+            ),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--courses", type=int, default=400)
+    parser.add_argument("--queue", type=int, default=100)
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8765)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
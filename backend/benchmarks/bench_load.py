@@ -0,0 +1,297 @@
+"""
+Prueba de carga de todos los endpoints contra el Moodle simulado.
+
+Levanta `FakeMoodle` en otro proceso (latencia, tamaños y errores
+configurables) y la API en proceso con su `lifespan` real, es decir con la
+misma configuración que en producción (Settings / .env; las variables de
+entorno permiten comparar, p. ej. `CACHE_ENABLED=false`). Cada endpoint
+recibe `--requests` peticiones con `--concurrency` simultáneas, repartidas
+entre `--users` usuarios, y se reporta req/s, p50/p95/p99, status y llamadas
+a Moodle por wsfunction.
+
+El resultado se guarda en JSON (por defecto `benchmarks/results/<commit>.json`)
+y con `--compare` se contrasta con una corrida anterior: termina con código 1
+si algún endpoint empeora más de `--threshold` en p50, p99 o req/s.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_load --requests 500 --concurrency 20
+    python -m benchmarks.bench_load --latency-distribution lognormal --error-rate 0.01
+    python -m benchmarks.bench_load --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from .common import fake_moodle_server, summarize
+from .fake_moodle import LATENCY_DISTRIBUTIONS
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+# ==================== Endpoints ====================
+
+def _endpoints(args) -> list[tuple[str, str, callable, dict | None]]:
+    """(nombre, método, ruta según el número de petición, cuerpo). Escrituras al final."""
+
+    def course(n: int) -> int:
+        return 2 + n % args.courses
+
+    def assignment(n: int) -> int:
+        return course(n) * 100 + n % args.assignments
+
+    def forum(n: int) -> int:
+        return course(n) * 10
+
+    def discussion(n: int) -> int:
+        return forum(n) * 100 + n % args.discussions
+
+    return [
+        ("GET /auth/me", "GET", lambda n: "/auth/me", None),
+        ("GET /auth/moodle-status", "GET", lambda n: "/auth/moodle-status", None),
+        ("POST /auth/dev-login", "POST", lambda n: "/auth/dev-login", "login"),
+        ("POST /auth/refresh", "POST", lambda n: "/auth/refresh", "refresh"),
+        ("GET /courses", "GET", lambda n: "/courses", None),
+        ("GET /courses/{course_id}", "GET", lambda n: f"/courses/{course(n)}", None),
+        ("GET /courses/{course_id}/contents", "GET", lambda n: f"/courses/{course(n)}/contents", None),
+        ("GET /assignments", "GET", lambda n: "/assignments", None),
+        ("GET /assignments/course/{course_id}", "GET", lambda n: f"/assignments/course/{course(n)}", None),
+        ("GET /assignments/{assignment_id}", "GET", lambda n: f"/assignments/{assignment(n)}", None),
+        ("GET /assignments/{assignment_id}/submission", "GET", lambda n: f"/assignments/{assignment(n)}/submission", None),
+        ("GET /forums", "GET", lambda n: "/forums", None),
+        ("GET /forums/course/{course_id}", "GET", lambda n: f"/forums/course/{course(n)}", None),
+        ("GET /forums/{forum_id}/discussions", "GET", lambda n: f"/forums/{forum(n)}/discussions?page=0&perpage=10", None),
+        ("GET /forums/discussions/{discussion_id}/posts", "GET", lambda n: f"/forums/discussions/{discussion(n)}/posts", None),
+        ("GET /me/dashboard", "GET", lambda n: "/me/dashboard", None),
+        ("GET /sync", "GET", lambda n: "/sync", None),
+        # Sincronización al día (después de la completa): delta vacío o casi
+        ("GET /sync?since", "GET", lambda n: f"/sync?since={time.time():.3f}", None),
+        ("POST /assignments/{assignment_id}/submit", "POST", lambda n: f"/assignments/{assignment(n)}/submit", {"text": "<p>Entrega</p>"}),
+        ("POST /forums/discussions/{discussion_id}/reply", "POST", lambda n: f"/forums/discussions/{discussion(n)}/reply", {"message": "<p>Respuesta</p>"}),
+    ]
+
+
+# ==================== Carga ====================
+
+def _payload(body, user: tuple[str, str, str]) -> dict | None:
+    """Cuerpo de la petición; `login` y `refresh` dependen del usuario."""
+    access, refresh, email = user
+    if body == "login":
+        return {"email": email}
+    if body == "refresh":
+        return {"refresh_token": refresh}
+    return body
+
+
+async def _run_endpoint(args, client, admin, users, endpoint) -> dict:
+    name, method, path, body = endpoint
+    await admin.post("/__reset")
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(n: int):
+        user = users[n % len(users)]
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(
+                method,
+                path(n),
+                json=_payload(body, user),
+                headers={"Authorization": f"Bearer {user[0]}"},
+            )
+            elapsed = time.perf_counter() - start
+        statuses[response.status_code] += 1
+        if response.status_code < 400:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    fake_stats = (await admin.get("/__stats")).json()
+    calls = {k: v for k, v in fake_stats.items() if not k.startswith("_")}
+    return {
+        **summarize(latencies, elapsed),
+        "status": {str(code): count for code, count in sorted(statuses.items())},
+        "upstream_round_trips": fake_stats["_round_trips"],
+        "upstream_per_request": round(fake_stats["_round_trips"] / args.requests, 3),
+        "upstream_calls": calls,
+    }
+
+
+async def _load(args, url: str) -> dict:
+    # La API lee Settings al importarse: se apunta al Moodle simulado antes
+    os.environ["MOODLE_URL"] = url
+    os.environ["DEBUG"] = "true"
+    from app.main import app
+    from app.utils.security import create_access_token, create_refresh_token
+
+    endpoints = [
+        endpoint for endpoint in _endpoints(args)
+        if not args.only or any(part in endpoint[0] for part in args.only)
+    ]
+    results = {}
+    async with app.router.lifespan_context(app):
+        users = []
+        for n in range(args.users):
+            claims = {"sub": "3", "email": f"usuario{n}@test.com", "fullname": f"Usuario {n}"}
+            users.append((create_access_token(claims), create_refresh_token(claims), claims["email"]))
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://api",
+            timeout=60.0,
+        )
+        admin = httpx.AsyncClient(base_url=url)
+        try:
+            for endpoint in endpoints:
+                name, method, path, body = endpoint
+                # Calentamiento: índices y caches como en un servidor ya en marcha
+                for n in range(args.warmup):
+                    user = users[n % len(users)]
+                    await client.request(
+                        method,
+                        path(n),
+                        json=_payload(body, user),
+                        headers={"Authorization": f"Bearer {user[0]}"},
+                    )
+                results[name] = await _run_endpoint(args, client, admin, users, endpoint)
+                print(f"{name}: {results[name]['rps']} req/s", file=sys.stderr)
+        finally:
+            await client.aclose()
+            await admin.aclose()
+    return results
+
+
+# ==================== Resultados ====================
+
+def _git_commit() -> tuple[str, bool]:
+    """Commit actual y si hay cambios sin commitear."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+
+def _compare(current: dict, baseline: dict, threshold: float) -> dict:
+    """Diferencias (%) por endpoint frente a una corrida anterior y regresiones."""
+    comparison = {}
+    for name, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        deltas = {}
+        for key in ("p50_ms", "p99_ms", "rps"):
+            if before[key]:
+                deltas[key] = round((now[key] - before[key]) / before[key] * 100, 1)
+        regressed = [
+            key for key, delta in deltas.items()
+            if (delta < -threshold if key == "rps" else delta > threshold)
+        ]
+        comparison[name] = {"delta_pct": deltas, "regressed": regressed}
+    return comparison
+
+
+def main(args) -> tuple[dict, bool]:
+    fake_options = {
+        "latency_ms": args.latency_ms,
+        "latency_distribution": args.latency_distribution,
+        "latency_sigma": args.latency_sigma,
+        "tail_ratio": args.tail_ratio,
+        "tail_ms": args.tail_ms,
+        "workers": args.workers,
+        "courses": args.courses,
+        "sections": args.sections,
+        "modules_per_section": args.modules,
+        "assignments_per_course": args.assignments,
+        "discussions_per_forum": args.discussions,
+        "posts_per_discussion": args.posts,
+        "text_bytes": args.text_bytes,
+        "error_rate": args.error_rate,
+        "http_error_rate": args.http_error_rate,
+        "seed": args.seed,
+    }
+    with fake_moodle_server(port=args.port, **fake_options) as url:
+        endpoints = asyncio.run(_load(args, url))
+
+    commit, dirty = _git_commit()
+    result = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "fake_moodle": fake_options,
+        },
+        "endpoints": endpoints,
+    }
+    regressed = False
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        result["comparison"] = _compare(result, baseline, args.threshold)
+        result["meta"]["baseline"] = baseline["meta"]["commit"]
+        regressed = any(entry["regressed"] for entry in result["comparison"].values())
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Resultados en {output}", file=sys.stderr)
+    return result, regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    # Carga
+    parser.add_argument("--requests", type=int, default=500, help="peticiones por endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10, help="peticiones previas sin medir")
+    parser.add_argument("--only", nargs="*", help="solo endpoints que contengan alguno de estos textos")
+    # Moodle simulado
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tail-ratio", type=float, default=0.0)
+    parser.add_argument("--tail-ms", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=0, help="procesos PHP-FPM simulados (0 = sin límite)")
+    parser.add_argument("--courses", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--modules", type=int, default=5)
+    parser.add_argument("--assignments", type=int, default=4)
+    parser.add_argument("--discussions", type=int, default=10)
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--text-bytes", type=int, default=200, help="bytes de cada texto HTML")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de excepciones de Moodle")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="fracción de HTTP 503")
+    parser.add_argument("--seed", type=int, default=0)
+    # Resultados
+    parser.add_argument("--output", help="archivo JSON (por defecto benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regresión tolerada (%%)")
+    result, regressed = main(parser.parse_args())
+    print(json.dumps(result.get("comparison") or result["endpoints"], indent=2))
+    sys.exit(1 if regressed else 0)
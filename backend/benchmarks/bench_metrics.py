@@ -0,0 +1,102 @@
+"""
+Costo de las métricas por petición.
+
+Llama directamente (sin red) a una app ASGI mínima con y sin
+`MetricsMiddleware`, para aislar lo que agrega medir cada petición
+(reloj, búsqueda de la ruta y `Histogram.observe`). También mide
+`observe` suelto y lo que tarda renderizar `/metrics`.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_metrics --requests 20000 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.middleware import MetricsMiddleware
+from app.services.metrics import REGISTRY, MetricsRegistry
+
+
+def _plain_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/courses/{course_id}")
+    async def course(course_id: int):
+        return PlainTextResponse("ok")
+
+    return app
+
+
+async def _drive(app, requests: int) -> float:
+    """Microsegundos por petición llamando a la app ASGI directamente."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/courses/2",
+        "raw_path": b"/courses/2",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [],
+        "server": ("api", 80),
+        "client": ("127.0.0.1", 1234),
+        "http_version": "1.1",
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def _observe_cost(samples: int) -> float:
+    histogram = MetricsRegistry().histogram("bench_seconds", "bench", ("route",))
+    start = time.perf_counter()
+    for n in range(samples):
+        histogram.observe(("/courses/{course_id}",), (n % 1000) / 10000)
+    return (time.perf_counter() - start) / samples * 1e9
+
+
+def _render_cost(rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        REGISTRY.render()
+    return (time.perf_counter() - start) / rounds * 1e3
+
+
+def main(args) -> dict:
+    # Rondas alternadas, tomando la mejor de cada variante, para restar ruido
+    plain_us = measured_us = float("inf")
+    for _ in range(args.rounds):
+        plain_us = min(plain_us, asyncio.run(_drive(_plain_app(), args.requests)))
+        measured_us = min(
+            measured_us, asyncio.run(_drive(MetricsMiddleware(_plain_app()), args.requests))
+        )
+    return {
+        "requests": args.requests,
+        "plain_us": round(plain_us, 2),
+        "with_metrics_us": round(measured_us, 2),
+        "overhead_us": round(measured_us - plain_us, 2),
+        "overhead_pct": round((measured_us - plain_us) / plain_us * 100, 1),
+        "observe_ns": round(_observe_cost(args.requests)),
+        "render_ms": round(_render_cost(100), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,112 @@
+"""
+Primeras pantallas después del login, con y sin precarga en segundo plano.
+
+Una tormenta de `--users` logins (repartidos en `--spread-ms`) contra un
+Moodle simulado lento; cada usuario, tras `--think-ms`, pide `/courses` y
+abre su primer curso (`/courses/{id}/contents`). Se mide la latencia de esas
+dos pantallas y el pico de llamadas simultáneas que recibe Moodle: sin
+precarga, con `PrefetchScheduler` acotado y con uno sin tope (para ver por
+qué hace falta el límite global).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_prefetch --users 100 --latency-ms 40
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.prefetch import PrefetchScheduler
+from .common import app_client, fake_moodle_server, summarize
+
+
+async def _storm(args, url: str, prefetcher: PrefetchScheduler | None) -> dict:
+    from app.main import app
+
+    async with httpx.AsyncClient(base_url=url) as admin:
+        await admin.post("/__reset")
+    latencies: list[float] = []
+    failures = 0
+    # Cliente de Moodle y cache nuevos por variante: nadie empieza con datos precargados
+    async with app_client(url) as client:
+        app.state.prefetch = prefetcher
+
+        async def user(n: int):
+            nonlocal failures
+            await asyncio.sleep(n * args.spread_ms / args.users / 1000)
+            login = await client.post("/auth/dev-login", json={"email": f"usuario{n}@test.com"})
+            if login.status_code != 200:
+                failures += 1
+                return
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            await asyncio.sleep(args.think_ms / 1000)
+            start = time.perf_counter()
+            courses = await client.get("/courses", headers=headers)
+            if courses.status_code != 200 or not courses.json():
+                failures += 1
+                return
+            contents = await client.get(
+                f"/courses/{courses.json()[0]['id']}/contents", headers=headers
+            )
+            if contents.status_code != 200:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(n) for n in range(args.users)))
+        elapsed = time.perf_counter() - start
+        if prefetcher is not None:
+            await prefetcher.close()
+        app.state.prefetch = None
+
+    async with httpx.AsyncClient(base_url=url) as admin:
+        fake_stats = (await admin.get("/__stats")).json()
+    result = summarize(latencies, elapsed)
+    del result["rps"]
+    return {
+        "first_screens": result,
+        "failures": failures,
+        "moodle_calls": fake_stats["_round_trips"],
+        "moodle_peak_in_flight": fake_stats["_peak_in_flight"],
+        "prefetch": prefetcher.stats() if prefetcher is not None else None,
+    }
+
+
+async def main(args) -> dict:
+    def scheduler(concurrency: int) -> PrefetchScheduler:
+        return PrefetchScheduler(
+            max_concurrency=concurrency,
+            max_pending=args.users,
+            max_courses=args.max_courses,
+        )
+
+    with fake_moodle_server(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        latency_distribution="lognormal",
+        courses=args.courses,
+        course_pool=args.course_pool,
+    ) as url:
+        return {
+            "users": args.users,
+            "without_prefetch": await _storm(args, url, None),
+            "prefetch_capped": await _storm(args, url, scheduler(args.concurrency)),
+            "prefetch_uncapped": await _storm(args, url, scheduler(args.users)),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--spread-ms", type=float, default=2000.0)
+    parser.add_argument("--think-ms", type=float, default=1500.0)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--courses", type=int, default=5)
+    parser.add_argument("--course-pool", type=int, default=500)
+    parser.add_argument("--max-courses", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16, help="precargas simultáneas")
+    parser.add_argument("--port", type=int, default=8765)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark de serialización por endpoint.
+
+Para cada endpoint se parte de los modelos ya construidos (como hace el
+router) y se compara:
+- actual: revalidación contra `response_model` + `jsonable_encoder` + json
+  de la librería estándar (lo que hace FastAPI al retornar modelos);
+- rápido: `json_response` (una sola validación, orjson).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serialization --posts 300 --rounds 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import TypeAdapter
+
+from app.main import app
+from app.utils.responses import json_response
+from .common import app_client
+from .fake_moodle import FakeMoodle
+
+ENDPOINTS = {
+    "/courses": "",
+    "/courses/{course_id}/contents": "/courses/2/contents",
+    "/assignments": "",
+    "/forums/{forum_id}/discussions": "/forums/20/discussions?limit=100",
+    "/forums/discussions/{discussion_id}/posts": "/forums/discussions/2001/posts?limit=200",
+    "/me/dashboard": "",
+}
+
+
+def _route(path: str) -> APIRoute:
+    return next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path)
+
+
+async def _time(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+async def main(args) -> dict:
+    fake = FakeMoodle(
+        latency_ms=0,
+        courses=args.courses,
+        sections=args.sections,
+        discussions_per_forum=100,
+        posts_per_discussion=args.posts,
+    )
+    results = {}
+    async with app_client(fake) as client:
+        for path, url in ENDPOINTS.items():
+            route = _route(path)
+            data = (await client.get(url or path)).json()
+            models = TypeAdapter(route.response_model).validate_python(data)
+
+            async def current():
+                content = await serialize_response(
+                    field=route.response_field,
+                    response_content=models,
+                    exclude_unset=route.response_model_exclude_unset,
+                )
+                JSONResponse(content)
+
+            async def fast():
+                json_response(models, exclude_unset=route.response_model_exclude_unset)
+
+            current_us = await _time(current, args.rounds)
+            fast_us = await _time(fast, args.rounds)
+            results[path] = {
+                "current_us": round(current_us, 1),
+                "fast_us": round(fast_us, 1),
+                "speedup": round(current_us / fast_us, 1),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--courses", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=200)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
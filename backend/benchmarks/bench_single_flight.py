@@ -0,0 +1,64 @@
+"""
+Dispara N llamadas idénticas concurrentes y cuenta las llamadas a Moodle.
+
+Con coalescencia activa, las N llamadas deben compartir una sola llamada
+upstream; también se comprueba que cancelar a uno de los llamadores no
+afecta a los demás.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_single_flight --callers 300
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.moodle_client import MoodleClient
+from .common import fake_moodle_server, summarize
+
+
+async def _burst(url: str, callers: int, coalesce: bool) -> dict:
+    async with httpx.AsyncClient() as http_client:
+        await http_client.post(f"{url}/__reset")
+        moodle = MoodleClient(url, "token", http_client=http_client, coalesce=coalesce)
+        latencies: list[float] = []
+
+        async def one():
+            start = time.perf_counter()
+            await moodle.get_course_contents(2)
+            latencies.append(time.perf_counter() - start)
+
+        tasks = [asyncio.ensure_future(one()) for _ in range(callers)]
+        # Un cliente se desconecta a mitad de la llamada
+        await asyncio.sleep(0)
+        tasks[0].cancel()
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        failed = [r for r in results[1:] if isinstance(r, BaseException)]
+
+        stats = (await http_client.get(f"{url}/__stats")).json()
+        return {
+            **summarize(latencies, elapsed),
+            "upstream_calls": stats.get("core_course_get_contents", 0),
+            "failed_after_cancel": len(failed),
+        }
+
+
+async def main(args) -> dict:
+    with fake_moodle_server(port=args.port, latency_ms=args.latency_ms) as url:
+        return {
+            "without_coalescing": await _burst(url, args.callers, coalesce=False),
+            "with_coalescing": await _burst(url, args.callers, coalesce=True),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callers", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=8765)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,120 @@
+"""
+Mantener al día la copia offline de la app: recargar todo vs `/sync`.
+
+En cada ronda se edita un curso en el Moodle simulado (y de vez en cuando se
+borra una sección), vence el cache de lecturas (como entre dos aperturas de
+la app) y el cliente se pone al día de tres formas:
+
+- `full_reload`: pide cursos, contenidos de cada curso, tareas, foros y la
+  primera página de discusiones de cada foro.
+- `revalidated_reload`: lo mismo, revalidando con If-None-Match (304).
+- `delta_sync`: un solo `GET /sync?since=...`.
+
+Se miden bytes en el cable (gzip), peticiones, llamadas a Moodle y tiempo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_sync --courses 8 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.services.sync import SnapshotStore
+from .common import app_client, wire_bytes
+from .fake_moodle import FakeMoodle
+
+HEADERS = {"Accept-Encoding": "gzip"}
+
+
+async def _full_reload(client, etags: dict | None) -> tuple[int, int]:
+    """Recarga todas las pantallas; con `etags` revalida. Retorna (bytes, peticiones)."""
+    total_bytes = requests = 0
+    # Con 304 no hay cuerpo: el cliente usa el que guardó la ronda anterior
+    bodies = etags.setdefault("__bodies", {}) if etags is not None else {}
+
+    async def get(path: str):
+        nonlocal total_bytes, requests
+        headers = dict(HEADERS)
+        if etags is not None and path in etags:
+            headers["If-None-Match"] = etags[path]
+        response = await client.get(path, headers=headers)
+        total_bytes += wire_bytes(response)
+        requests += 1
+        if response.status_code == 304:
+            return bodies[path]
+        if etags is not None and "etag" in response.headers:
+            etags[path] = response.headers["etag"]
+        bodies[path] = response.json()
+        return bodies[path]
+
+    courses = await get("/courses")
+    await get("/assignments")
+    forums = await get("/forums")
+    for course in courses:
+        await get(f"/courses/{course['id']}/contents")
+    for group in forums:
+        for forum in group["forums"]:
+            await get(f"/forums/{forum['id']}/discussions")
+    return total_bytes, requests
+
+
+async def _variant(args, name: str) -> dict:
+    from app.main import app
+
+    fake = FakeMoodle(
+        latency_ms=0,
+        courses=args.courses,
+        sections=args.sections,
+        text_bytes=args.text_bytes,
+    )
+    totals = {"bytes": 0, "requests": 0, "moodle_calls": 0, "ms": 0.0}
+    async with app_client(fake) as client:
+        app.state.snapshots = SnapshotStore()
+        moodle = app.state.moodle
+        etags: dict = {}
+        since = None
+        for round_number in range(args.rounds + 1):
+            if round_number:
+                fake.revisions[2 + round_number % args.courses] += 1
+                if round_number % 5 == 0:
+                    fake.deleted_sections[2 + round_number % args.courses] += 1
+            moodle.cache.clear()
+            calls_before = fake.round_trips
+            start = time.perf_counter()
+            if name == "delta_sync":
+                params = {"since": since} if since is not None else {}
+                response = await client.get("/sync", params=params, headers=HEADERS)
+                since = response.json()["server_time"]
+                round_bytes, requests = wire_bytes(response), 1
+            else:
+                round_bytes, requests = await _full_reload(
+                    client, etags if name == "revalidated_reload" else None
+                )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # La primera ronda es la carga inicial (igual para todos): no se cuenta
+            if round_number:
+                totals["bytes"] += round_bytes
+                totals["requests"] += requests
+                totals["moodle_calls"] += fake.round_trips - calls_before
+                totals["ms"] += elapsed_ms
+    return {key: round(value / args.rounds, 1) for key, value in totals.items()}
+
+
+async def main(args) -> dict:
+    results = {}
+    for name in ("full_reload", "revalidated_reload", "delta_sync"):
+        results[name] = await _variant(args, name)
+    results["bytes_saved_vs_full_pct"] = round(
+        100 * (1 - results["delta_sync"]["bytes"] / results["full_reload"]["bytes"]), 1
+    )
+    return {"per_round": results, "courses": args.courses, "rounds": args.rounds}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--courses", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--text-bytes", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=20)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
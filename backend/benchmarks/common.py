@@ -0,0 +1,121 @@
+"""Utilidades compartidas por los benchmarks."""
+import multiprocessing
+import socket
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por rango más cercano (valores en cualquier unidad)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Resume latencias (segundos) y tiempo total en un dict serializable."""
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def _serve(factory: str, port: int, options: dict) -> None:
+    import importlib
+    import uvicorn
+
+    module, name = factory.rsplit(".", 1)
+    server = getattr(importlib.import_module(module), name)(**options)
+    uvicorn.run(server.app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"El servidor simulado no arrancó en el puerto {port}")
+
+
+@contextmanager
+def _server_process(factory: str, port: int, options: dict):
+    process = multiprocessing.Process(
+        target=_serve, args=(factory, port, options), daemon=True
+    )
+    process.start()
+    try:
+        _wait_for_port(port)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+@contextmanager
+def fake_moodle_server(port: int = 8765, **options):
+    """Levanta el Moodle simulado en otro proceso y entrega su URL base."""
+    with _server_process("benchmarks.fake_moodle.FakeMoodle", port, options) as url:
+        yield url
+
+
+@contextmanager
+def fake_google_server(port: int = 8766, **options):
+    """Levanta el servidor de claves de Google simulado y entrega su URL base."""
+    with _server_process("benchmarks.fake_google.FakeGoogleCerts", port, options) as url:
+        yield url
+
+
+@asynccontextmanager
+async def app_client(fake, user_id: int = 3, **moodle_options):
+    """
+    Cliente HTTP en proceso para la API, conectada a un `FakeMoodle` en proceso
+    o, si `fake` es una URL, al Moodle simulado de `fake_moodle_server`.
+    Entrega el cliente ya autenticado como `user_id`.
+    """
+    from app.main import app
+    from app.services.cache import ResponseCache
+    from app.services.moodle_client import MoodleClient
+    from app.utils.security import create_access_token
+
+    moodle_options.setdefault("cache", ResponseCache(64 * 1024 * 1024))
+    if isinstance(fake, str):
+        moodle_url = fake
+        moodle_http = httpx.AsyncClient(
+            timeout=30.0, limits=httpx.Limits(max_connections=1000)
+        )
+    else:
+        moodle_url = "http://fake-moodle"
+        moodle_http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    app.state.moodle = MoodleClient(
+        moodle_url, "token", http_client=moodle_http, **moodle_options
+    )
+    token = create_access_token(
+        {"sub": str(user_id), "email": "estudiante@test.com", "fullname": "Estudiante"}
+    )
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://api",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    try:
+        yield client
+    finally:
+        await client.aclose()
+        await moodle_http.aclose()
+
+
+def wire_bytes(response: httpx.Response) -> int:
+    """Bytes aproximados en el cable: línea de estado, headers y cuerpo (comprimido)."""
+    headers = sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+    body = int(response.headers.get("content-length", len(response.content)))
+    return 17 + headers + body
@@ -0,0 +1,86 @@
+"""
+Servidor de claves de Google simulado para benchmarks locales.
+
+Publica un JWKS en `/oauth2/v3/certs` con Cache-Control, como Google, y
+firma ID tokens de prueba con su propia clave RSA, así el login con Google
+se puede medir sin red ni cuenta real. `/__stats` cuenta las descargas.
+"""
+import asyncio
+import time
+import uuid
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+ISSUER = "https://accounts.google.com"
+
+
+def generate_private_key() -> str:
+    """Clave RSA nueva en PEM (para compartirla entre procesos)."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+class FakeGoogleCerts:
+    """JWKS y emisor de ID tokens del Google simulado."""
+
+    def __init__(
+        self,
+        private_key: str | None = None,
+        kid: str = "test-key",
+        latency_ms: float = 20.0,
+        max_age: int = 3600,
+    ):
+        self.private_key = private_key or generate_private_key()
+        self.kid = kid
+        self.latency_ms = latency_ms
+        self.max_age = max_age
+        self.fetches = 0
+
+    def jwks(self) -> dict:
+        public = jwk.construct(self.private_key, "RS256").public_key().to_dict()
+        return {"keys": [{**public, "kid": self.kid, "use": "sig"}]}
+
+    def id_token(self, email: str, client_id: str, ttl: int = 3600) -> str:
+        """ID token firmado con la clave de prueba."""
+        now = int(time.time())
+        claims = {
+            "iss": ISSUER,
+            "aud": client_id,
+            "sub": uuid.uuid4().hex,
+            "email": email,
+            "email_verified": True,
+            "name": email.split("@")[0],
+            "iat": now,
+            "exp": now + ttl,
+        }
+        return jwt.encode(
+            claims, self.private_key, algorithm="RS256", headers={"kid": self.kid}
+        )
+
+    async def certs(self, request: Request) -> JSONResponse:
+        self.fetches += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return JSONResponse(
+            self.jwks(),
+            headers={"Cache-Control": f"public, max-age={self.max_age}, must-revalidate"},
+        )
+
+    async def stats(self, request: Request) -> JSONResponse:
+        return JSONResponse({"fetches": self.fetches})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/oauth2/v3/certs", self.certs),
+            Route("/__stats", self.stats),
+        ])
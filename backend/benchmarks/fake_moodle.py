@@ -0,0 +1,393 @@
+"""
+Moodle simulado para benchmarks locales.
+
+Implementa `webservice/rest/server.php` para las funciones que usa
+`MoodleClient`, con una latencia artificial por llamada (fija o según una
+distribución, global o por wsfunction), tamaños de contenido configurables,
+errores inyectados y un contador de llamadas por wsfunction consultable en
+`/__stats`. Con la misma `seed` las latencias y los errores se repiten.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+from collections import Counter
+from starlette.applications import Starlette
+from starlette.datastructures import FormData
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def _int_param(form, name: str, default: int = 0) -> int:
+    """Lee un parámetro entero aceptando `name` o `name[0]`."""
+    value = form.get(name, form.get(f"{name}[0]"))
+    return int(value) if value is not None else default
+
+
+def _list_param(form, name: str) -> list[int]:
+    """Lee un parámetro de lista en formato `name[0]=..` o `name=..` repetido."""
+    values = [v for k, v in form.multi_items() if k.startswith(f"{name}[")]
+    if not values:
+        values = form.getlist(name)
+    return [int(v) for v in values]
+
+
+# Distribuciones de latencia con media `latency_ms`
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+_FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. "
+
+
+def _flatten(params: dict, prefix: str = "") -> list[tuple[str, str]]:
+    """Convierte argumentos JSON al formato de formulario de PHP (`a[0]=..`)."""
+    items = []
+    for name, value in params.items():
+        key = f"{prefix}[{name}]" if prefix else str(name)
+        if isinstance(value, dict):
+            items.extend(_flatten(value, key))
+        elif isinstance(value, list):
+            items.extend(_flatten(dict(enumerate(value)), key))
+        else:
+            items.append((key, str(value)))
+    return items
+
+
+class FakeMoodle:
+    """Datos y handlers del Moodle simulado."""
+
+    def __init__(
+        self,
+        latency_ms: float = 5.0,
+        courses: int = 5,
+        sections: int = 6,
+        modules_per_section: int = 5,
+        assignments_per_course: int = 4,
+        discussions_per_forum: int = 10,
+        posts_per_discussion: int = 20,
+        batching: bool = True,
+        workers: int = 0,
+        tail_ratio: float = 0.0,
+        tail_ms: float = 0.0,
+        latency_distribution: str = "fixed",
+        latency_sigma: float = 0.5,
+        function_latency_ms: dict[str, float] | None = None,
+        text_bytes: int = 0,
+        error_rate: float = 0.0,
+        http_error_rate: float = 0.0,
+        seed: int | None = 0,
+        course_pool: int = 0,
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia desconocida: {latency_distribution}")
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        # Dispersión de la lognormal (sigma del logaritmo)
+        self.latency_sigma = latency_sigma
+        # Latencia media por wsfunction (reemplaza a latency_ms para esas funciones)
+        self.function_latency_ms = function_latency_ms or {}
+        self.courses = courses
+        # Si es > 0, cada usuario tiene `courses` cursos de un total de `course_pool`
+        self.course_pool = course_pool
+        self.sections = sections
+        self.modules_per_section = modules_per_section
+        self.assignments_per_course = assignments_per_course
+        self.discussions_per_forum = discussions_per_forum
+        self.posts_per_discussion = posts_per_discussion
+        self.batching = batching
+        # Procesos PHP-FPM simulados: con todos ocupados las peticiones hacen cola
+        self.workers = asyncio.Semaphore(workers) if workers else None
+        # Fracción de llamadas que caen en un worker lento y su latencia
+        self.tail_ratio = tail_ratio
+        self.tail_ms = tail_ms
+        # Bytes mínimos de cada texto HTML (resúmenes, enunciados, mensajes)
+        self.text_bytes = text_bytes
+        # Fracción de llamadas que responden una excepción de Moodle o un HTTP 503
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.random = random.Random(seed)
+        self.injected_errors = 0
+        self.injected_http_errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls: Counter = Counter()
+        # Cambios simulados por curso (`/__edit`) y secciones borradas (`/__delete`)
+        self.epoch = int(time.time())
+        self.revisions: Counter = Counter()
+        self.deleted_sections: Counter = Counter()
+        self.round_trips = 0
+        self.handlers = {
+            "core_webservice_get_site_info": self.site_info,
+            "core_user_get_users": self.users,
+            "core_enrol_get_users_courses": self.user_courses,
+            "core_course_get_contents": self.course_contents,
+            "mod_assign_get_assignments": self.assignments,
+            "mod_assign_get_submission_status": self.submission_status,
+            "mod_assign_save_submission": self.save_submission,
+            "mod_forum_get_forums_by_courses": self.forums,
+            "mod_forum_get_forum_discussions": self.discussions,
+            "mod_forum_get_discussion_posts": self.posts,
+            "mod_forum_add_discussion_post": self.add_post,
+        }
+        if batching:
+            self.handlers["tool_mobile_call_external_functions"] = self.call_external_functions
+
+    # ==================== Datos ====================
+
+    def _text(self, html: str) -> str:
+        """Texto HTML rellenado hasta `text_bytes`."""
+        missing = self.text_bytes - len(html)
+        if missing <= 0:
+            return html
+        filler = (_FILLER * (missing // len(_FILLER) + 1))[:missing]
+        return f"{html[:-4]} {filler}</p>"
+
+    def site_info(self, form) -> dict:
+        return {"sitename": "Fake Moodle", "userid": 2, "username": "admin", "fullname": "Admin User"}
+
+    def users(self, form) -> dict:
+        email = form.get("criteria[0][value]", "estudiante@test.com")
+        if email.startswith("noexiste"):
+            return {"users": [], "warnings": []}
+        # Un ID distinto (y estable) por email; el estudiante por defecto es el 3
+        user_id = 3 if email == "estudiante@test.com" else 1000 + zlib.crc32(email.encode()) % 1000000
+        return {"users": [{"id": user_id, "email": email, "fullname": "Estudiante de Prueba"}]}
+
+    def user_courses(self, form) -> list:
+        course_ids = range(2, 2 + self.courses)
+        if self.course_pool:
+            user_id = _int_param(form, "userid")
+            course_ids = [2 + (user_id + n) % self.course_pool for n in range(self.courses)]
+        return [
+            {
+                "id": course_id,
+                "shortname": f"C{course_id}",
+                "fullname": f"Curso {course_id}",
+                "summary": self._text("<p>Resumen del curso</p>"),
+                "startdate": 1704067200,
+                "timemodified": 1704067200,
+                "enddate": 1735689600,
+            }
+            for course_id in course_ids
+        ]
+
+    def course_contents(self, form) -> list:
+        course_id = _int_param(form, "courseid")
+        return [
+            {
+                "id": course_id * 100 + section,
+                "name": f"Tema {section}" + (f" (rev {self.revisions[course_id]})" if section == 0 and self.revisions[course_id] else ""),
+                "summary": self._text("<p>Contenido del tema</p>"),
+                "modules": [
+                    {
+                        "id": course_id * 1000 + section * 10 + module,
+                        "name": f"Recurso {module}",
+                        "instance": module,
+                        "modname": "resource",
+                        "modplural": "Recursos",
+                        "url": f"http://fake/mod/resource/view.php?id={module}",
+                        "description": self._text("<p>Descripción del recurso</p>"),
+                        "contents": [{"type": "file", "filename": "apunte.pdf", "filesize": 1024}],
+                    }
+                    for module in range(self.modules_per_section)
+                ],
+            }
+            for section in range(self.sections - self.deleted_sections[course_id])
+        ]
+
+    def assignments(self, form) -> dict:
+        return {
+            "courses": [
+                {
+                    "id": course_id,
+                    "assignments": [
+                        {
+                            "id": course_id * 100 + n,
+                            "course": course_id,
+                            "name": f"Tarea {n}" + (f" (rev {self.revisions[course_id]})" if n == 0 and self.revisions[course_id] else ""),
+                            "intro": self._text("<p>Enunciado</p>"),
+                            "duedate": self.epoch + (n + 1) * 86400,
+                            "allowsubmissionsfromdate": 1704672000,
+                            "grade": 100,
+                            "timemodified": 1704672000 + (self.revisions[course_id] if n == 0 else 0),
+                        }
+                        for n in range(self.assignments_per_course)
+                    ],
+                }
+                for course_id in _list_param(form, "courseids")
+            ]
+        }
+
+    def submission_status(self, form) -> dict:
+        return {"lastattempt": {"submission": {"status": "new"}}, "feedback": {}}
+
+    def save_submission(self, form) -> list:
+        return []
+
+    def forums(self, form) -> list:
+        return [
+            {"id": course_id * 10, "course": course_id, "name": "Foro General", "intro": "", "type": "general", "timemodified": 1704672000}
+            for course_id in _list_param(form, "courseids")
+        ]
+
+    def discussions(self, form) -> dict:
+        forum_id = _int_param(form, "forumid")
+        page = _int_param(form, "page", -1)
+        perpage = _int_param(form, "perpage", 0)
+        start, end = 0, self.discussions_per_forum
+        if page >= 0 and perpage > 0:
+            start = page * perpage
+            end = min(end, start + perpage)
+        return {
+            "discussions": [
+                {
+                    # Como en Moodle: `id` es el primer post y `discussion` la discusión
+                    "id": (forum_id * 100 + n) * 100,
+                    "discussion": forum_id * 100 + n,
+                    "name": f"Discusión {n}",
+                    "message": self._text("<p>Mensaje inicial</p>"),
+                    "userid": 3,
+                    "userfullname": "Estudiante de Prueba",
+                    "created": 1704672000 + n,
+                    "modified": 1704758400 + n,
+                    "numreplies": self.posts_per_discussion - 1,
+                }
+                for n in range(start, end)
+            ]
+        }
+
+    def posts(self, form) -> dict:
+        discussion_id = _int_param(form, "discussionid")
+        first = discussion_id * 100
+        return {
+            "posts": [
+                {
+                    "id": first + n,
+                    "discussion": discussion_id,
+                    "parent": 0 if n == 0 else first,
+                    "userid": 3,
+                    "userfullname": "Estudiante de Prueba",
+                    "message": self._text("<p>Respuesta</p>"),
+                    "created": 1704672000 + n,
+                }
+                for n in range(self.posts_per_discussion)
+            ]
+        }
+
+    def add_post(self, form) -> dict:
+        return {"postid": 999999, "warnings": []}
+
+    def call_external_functions(self, form) -> dict:
+        responses = []
+        index = 0
+        while f"requests[{index}][function]" in form:
+            function = form[f"requests[{index}][function]"]
+            arguments = json.loads(form.get(f"requests[{index}][arguments]", "{}"))
+            index += 1
+            self.calls[function] += 1
+            handler = self.handlers.get(function)
+            if handler is None:
+                error = {"exception": "moodle_exception", "errorcode": "invalidrecord", "message": "Función no soportada"}
+                responses.append({"error": True, "exception": json.dumps(error)})
+                continue
+            responses.append({"error": False, "data": json.dumps(handler(FormData(_flatten(arguments))))})
+        return {"responses": responses}
+
+    # ==================== Latencia y errores ====================
+
+    def _latency(self, function: str) -> float:
+        """Latencia (ms) de una llamada según la distribución configurada."""
+        if self.tail_ratio and self.random.random() < self.tail_ratio:
+            return self.tail_ms
+        mean = self.function_latency_ms.get(function, self.latency_ms)
+        if not mean or self.latency_distribution == "fixed":
+            return mean
+        if self.latency_distribution == "uniform":
+            return self.random.uniform(0, 2 * mean)
+        if self.latency_distribution == "exponential":
+            return self.random.expovariate(1 / mean)
+        # lognormal con media `mean`: mu = ln(mean) - sigma^2 / 2
+        sigma = self.latency_sigma
+        return self.random.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+
+    def _injected_error(self) -> JSONResponse | None:
+        """Respuesta de error inyectada, o None si la llamada sigue normal."""
+        if self.http_error_rate and self.random.random() < self.http_error_rate:
+            self.injected_http_errors += 1
+            return JSONResponse({"error": "Service Unavailable"}, status_code=503)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            return JSONResponse(
+                {"exception": "dml_read_exception", "errorcode": "dmlreadexception", "message": "Error al leer la base de datos"}
+            )
+        return None
+
+    # ==================== ASGI ====================
+
+    async def server(self, request: Request) -> JSONResponse:
+        form = await request.form()
+        function = form.get("wsfunction", "")
+        self.calls[function] += 1
+        self.round_trips += 1
+        handler = self.handlers.get(function)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        latency = self._latency(function)
+        try:
+            if self.workers is not None:
+                async with self.workers:
+                    await asyncio.sleep(latency / 1000)
+            elif latency:
+                await asyncio.sleep(latency / 1000)
+        finally:
+            self.in_flight -= 1
+        error = self._injected_error()
+        if error is not None:
+            return error
+        if handler is None:
+            return JSONResponse(
+                {"exception": "moodle_exception", "errorcode": "invalidrecord", "message": "Función no soportada"}
+            )
+        return JSONResponse(handler(form))
+
+    async def stats(self, request: Request) -> JSONResponse:
+        return JSONResponse({
+            **self.calls,
+            "_round_trips": self.round_trips,
+            "_peak_in_flight": self.peak_in_flight,
+            "_injected_errors": self.injected_errors,
+            "_injected_http_errors": self.injected_http_errors,
+        })
+
+    async def reset(self, request: Request) -> JSONResponse:
+        self.calls.clear()
+        self.round_trips = 0
+        self.peak_in_flight = 0
+        self.injected_errors = 0
+        self.injected_http_errors = 0
+        return JSONResponse({})
+
+    async def edit(self, request: Request) -> JSONResponse:
+        """Simula una edición en el curso: cambia la sección 0 y la primera tarea."""
+        course_id = int(request.query_params["courseid"])
+        self.revisions[course_id] += 1
+        return JSONResponse({"revision": self.revisions[course_id]})
+
+    async def delete(self, request: Request) -> JSONResponse:
+        """Simula el borrado de la última sección del curso."""
+        course_id = int(request.query_params["courseid"])
+        self.deleted_sections[course_id] += 1
+        return JSONResponse({"deleted_sections": self.deleted_sections[course_id]})
+
+    def app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route("/webservice/rest/server.php", self.server, methods=["POST"]),
+                Route("/__stats", self.stats),
+                Route("/__reset", self.reset, methods=["POST"]),
+                Route("/__edit", self.edit, methods=["POST"]),
+                Route("/__delete", self.delete, methods=["POST"]),
+            ]
+        )
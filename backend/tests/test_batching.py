@@ -0,0 +1,103 @@
+"""Agrupación de lecturas en `tool_mobile_call_external_functions` (MoodleBatcher)."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.batcher import BATCH_FUNCTION
+from app.services.exceptions import MoodleError
+from app.services.moodle_client import MoodleClient
+from benchmarks.fake_moodle import FakeMoodle
+
+
+def _client(fake: FakeMoodle, batching: bool) -> tuple[MoodleClient, httpx.AsyncClient]:
+    # Sin cache de respuestas: cada lectura llega a Moodle (sola o en un lote)
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    moodle = MoodleClient(
+        "http://fake-moodle", "token", http_client=http,
+        batching=batching, batch_window_ms=20,
+    )
+    return moodle, http
+
+
+def _screen(moodle: MoodleClient):
+    """Lecturas de una pantalla compuesta, lanzadas a la vez."""
+    return asyncio.gather(
+        moodle.get_course_contents(2),
+        moodle.get_course_contents(3),
+        moodle.get_assignments(2),
+        return_exceptions=True,
+    )
+
+
+def _run(fake_batching: bool, scenario):
+    async def main():
+        fake = FakeMoodle(latency_ms=0, batching=fake_batching)
+        moodle, http = _client(fake, batching=True)
+        try:
+            return fake, moodle, await scenario(fake, moodle)
+        finally:
+            await http.aclose()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="module")
+def expected():
+    """Resultados de las mismas lecturas hechas una por una, sin batcher."""
+    async def main():
+        fake = FakeMoodle(latency_ms=0)
+        moodle, http = _client(fake, batching=False)
+        try:
+            return await _screen(moodle)
+        finally:
+            await http.aclose()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_reads_go_in_one_batch(expected):
+    fake, moodle, results = _run(True, lambda fake, moodle: _screen(moodle))
+
+    assert fake.round_trips == 1
+    assert fake.calls[BATCH_FUNCTION] == 1
+    # Cada llamador recibe su propio resultado, en su lugar
+    assert results == expected
+    assert moodle.batcher.stats() == {"available": True, "batches": 1, "batched_calls": 3}
+
+
+def test_error_inside_batch_reaches_only_its_caller(expected):
+    async def scenario(fake, moodle):
+        del fake.handlers["mod_forum_get_forums_by_courses"]
+        return await asyncio.gather(
+            moodle.get_course_contents(2),
+            moodle.get_forums_by_courses([2]),
+            return_exceptions=True,
+        )
+
+    fake, moodle, (contents, forums) = _run(True, scenario)
+
+    assert fake.round_trips == 1
+    assert contents == expected[0]
+    assert isinstance(forums, MoodleError)
+    assert forums.errorcode == "invalidrecord"
+    # Un error de una llamada no desactiva el batcher
+    assert moodle.batcher.available
+
+
+def test_without_batch_function_falls_back_to_single_calls(expected):
+    async def scenario(fake, moodle):
+        first = await _screen(moodle)
+        round_trips = fake.round_trips
+        await asyncio.gather(moodle.get_course_contents(4), moodle.get_assignments(3))
+        return first, round_trips
+
+    fake, moodle, (results, first_round_trips) = _run(False, scenario)
+
+    assert results == expected
+    # Un lote rechazado y luego las tres llamadas por separado
+    assert first_round_trips == 1 + 3
+    assert not moodle.batcher.available
+    # Después ya no se intenta agrupar
+    assert fake.round_trips == first_round_trips + 2
+    assert fake.calls[BATCH_FUNCTION] == 1
@@ -0,0 +1,74 @@
+"""`/me/dashboard` cuando fallan algunas llamadas de estado de entrega."""
+import asyncio
+
+import httpx
+
+from app.services.exceptions import MoodleOverloaded
+from benchmarks.common import app_client
+from benchmarks.fake_moodle import FakeMoodle
+
+FAILING_ASSIGNMENT = 200
+
+
+class FlakyTransport(httpx.ASGITransport):
+    """Corta la conexión en el estado de entrega de una tarea."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.content
+        if b"mod_assign_get_submission_status" in body and b"assignid=%d" % FAILING_ASSIGNMENT in body:
+            raise httpx.ConnectError("Conexión rechazada", request=request)
+        return await super().handle_async_request(request)
+
+
+def _fake() -> FakeMoodle:
+    fake = FakeMoodle(latency_ms=0)
+    fake.handlers["mod_assign_get_submission_status"] = lambda form: {
+        "lastattempt": {"submission": {"status": "submitted"}},
+        "feedback": {},
+    }
+    return fake
+
+
+def test_transport_error_degrades_only_that_assignment():
+    from app.main import app
+
+    async def scenario():
+        fake = _fake()
+        async with app_client(fake) as client:
+            flaky = httpx.AsyncClient(transport=FlakyTransport(app=fake.app()))
+            app.state.moodle.http_client = flaky
+            try:
+                return await client.get("/me/dashboard")
+            finally:
+                await flaky.aclose()
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    statuses = {
+        assignment["id"]: assignment["submission"]["status"]
+        for assignment in response.json()["upcoming_assignments"]
+    }
+    assert statuses[FAILING_ASSIGNMENT] == "new"
+    assert len(statuses) > 1
+    assert all(status == "submitted" for id_, status in statuses.items() if id_ != FAILING_ASSIGNMENT)
+
+
+def test_overloaded_moodle_answers_503():
+    from app.main import app
+
+    async def scenario():
+        async with app_client(_fake()) as client:
+            await client.get("/courses")
+            moodle = app.state.moodle
+
+            async def overloaded(*args, **kwargs):
+                raise MoodleOverloaded(retry_after=2)
+
+            moodle._fetch = overloaded
+            return await client.get(f"/assignments/{FAILING_ASSIGNMENT}/submission")
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
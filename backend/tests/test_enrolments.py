@@ -0,0 +1,64 @@
+"""Índice de matrículas de MoodleClient: cuánto puede atrasarse respecto a Moodle."""
+import asyncio
+
+import httpx
+
+from app.services.cache import ResponseCache
+from app.services.moodle_client import MoodleClient
+from benchmarks.fake_moodle import FakeMoodle
+
+ENROLMENT_TTL = 0.05
+
+
+def _client(fake: FakeMoodle) -> tuple[MoodleClient, httpx.AsyncClient]:
+    # Cache de respuestas con su TTL por defecto (300 s para las matrículas)
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    moodle = MoodleClient(
+        "http://fake-moodle", "token", http_client=http,
+        cache=ResponseCache(10 * 1024 * 1024), enrolment_ttl=ENROLMENT_TTL,
+    )
+    return moodle, http
+
+
+def test_expired_index_rereads_enrolments_from_moodle():
+    async def scenario():
+        fake = FakeMoodle(latency_ms=0, courses=3)
+        moodle, http = _client(fake)
+        try:
+            before = await moodle.get_user_course_map(3)
+            # Baja de los cursos 3 y 4 en Moodle
+            fake.courses = 1
+            cached = await moodle.get_user_course_map(3)
+            await asyncio.sleep(ENROLMENT_TTL * 2)
+            after = await moodle.get_user_course_map(3)
+        finally:
+            await http.aclose()
+        return fake, before, cached, after
+
+    fake, before, cached, after = asyncio.run(scenario())
+
+    assert list(before) == [2, 3, 4]
+    # Dentro de `enrolment_ttl` responde el índice, sin llamar a Moodle
+    assert list(cached) == [2, 3, 4]
+    # Vencido el índice no se reindexa la respuesta cacheada (300 s), se pide de nuevo
+    assert list(after) == [2]
+    assert fake.calls["core_enrol_get_users_courses"] == 2
+
+
+def test_unenrolled_student_stops_getting_rendered_course_responses():
+    from benchmarks.common import app_client
+
+    async def scenario():
+        fake = FakeMoodle(latency_ms=0, courses=3)
+        statuses = []
+        async with app_client(fake, enrolment_ttl=ENROLMENT_TTL) as client:
+            for _ in range(2):
+                statuses.append((await client.get("/courses/3/contents")).status_code)
+            # Baja del curso 3 en Moodle: la respuesta ya armada no debe sobrevivirla
+            fake.courses = 1
+            await asyncio.sleep(ENROLMENT_TTL * 2)
+            statuses.append((await client.get("/courses/3/contents")).status_code)
+            statuses.append((await client.get("/assignments/course/3")).status_code)
+        return statuses
+
+    assert asyncio.run(scenario()) == [200, 200, 404, 404]
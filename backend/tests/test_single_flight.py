@@ -0,0 +1,79 @@
+"""Coalescencia de lecturas idénticas concurrentes (single-flight) en MoodleClient."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.exceptions import MoodleError
+from app.services.moodle_client import MoodleClient
+from benchmarks.fake_moodle import FakeMoodle
+
+CALLERS = 10
+
+
+def _client(fake: FakeMoodle) -> tuple[MoodleClient, httpx.AsyncClient]:
+    # Sin cache de respuestas: lo único que puede evitar llamadas es el single-flight
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    return MoodleClient("http://fake-moodle", "token", http_client=http), http
+
+
+async def _concurrent_reads(moodle: MoodleClient, cancel_one: bool) -> list:
+    tasks = [asyncio.create_task(moodle.get_course_contents(2)) for _ in range(CALLERS)]
+    await asyncio.sleep(0.01)
+    if cancel_one:
+        tasks[0].cancel()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_concurrent_reads_share_one_upstream_call():
+    async def scenario():
+        fake = FakeMoodle(latency_ms=50)
+        moodle, http = _client(fake)
+        try:
+            results = await _concurrent_reads(moodle, cancel_one=True)
+        finally:
+            await http.aclose()
+        return fake, results
+
+    fake, results = asyncio.run(scenario())
+
+    assert fake.calls["core_course_get_contents"] == 1
+    assert isinstance(results[0], asyncio.CancelledError)
+    # Cancelar a un llamador no cancela la llamada compartida de los demás
+    assert all(isinstance(result, list) and result for result in results[1:])
+    assert all(result == results[1] for result in results[1:])
+
+
+def test_error_reaches_every_waiter():
+    async def scenario():
+        fake = FakeMoodle(latency_ms=50, error_rate=1.0)
+        moodle, http = _client(fake)
+        try:
+            results = await _concurrent_reads(moodle, cancel_one=False)
+        finally:
+            await http.aclose()
+        return fake, results
+
+    fake, results = asyncio.run(scenario())
+
+    assert fake.calls["core_course_get_contents"] == 1
+    assert all(isinstance(result, MoodleError) for result in results)
+
+
+def test_next_read_after_error_goes_upstream_again():
+    async def scenario():
+        fake = FakeMoodle(latency_ms=0, error_rate=1.0)
+        moodle, http = _client(fake)
+        try:
+            with pytest.raises(MoodleError):
+                await moodle.get_course_contents(2)
+            fake.error_rate = 0.0
+            contents = await moodle.get_course_contents(2)
+        finally:
+            await http.aclose()
+        return fake, contents
+
+    fake, contents = asyncio.run(scenario())
+
+    assert fake.calls["core_course_get_contents"] == 2
+    assert contents